@@ -3,17 +3,340 @@ Based on LibCal API Docs at: https://<your_domain>.libcal.com/admin/api/1.1
 
 License: https://grant-miller.mit-license.org/
 '''
+import argparse
+import asyncio
+import bisect
+import codecs
+import concurrent.futures
+import contextlib
+import contextvars
+import csv
 import datetime
+import gzip
+import heapq
+import http.cookiejar
+import json
+import os
+import re
 import requests
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.parse
+from collections import OrderedDict, defaultdict, deque
 from copy import copy
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+_deadlineVar = contextvars.ContextVar('libcal_deadline', default=None)  # time.monotonic() value
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    '''
+    Limit the total time of every request made inside this block, including nested traversals
+        like location.spaces and work submitted with LibCal.submit().
+    Nested deadlines can only shorten the time left, never extend it.
+    Once the deadline passes, the next request raises DeadlineExceeded.
+
+    Example:
+        with deadline(5):
+            spaces = [space for location in lc.locations for space in location.spaces]
+    '''
+    end = time.monotonic() + seconds
+    outer = _deadlineVar.get()
+    token = _deadlineVar.set(end if outer is None else min(outer, end))
+    try:
+        yield
+    finally:
+        _deadlineVar.reset(token)
+
+
+def _remaining(timeout=None):
+    '''
+    :param timeout: float, the longest a single request may take
+    :return: seconds a request may take given the current deadline, or timeout if there is no deadline
+    '''
+    end = _deadlineVar.get()
+    if end is None:
+        return timeout
+
+    left = end - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded('Deadline exceeded')
+    return left if timeout is None else min(timeout, left)
+
+
+class _Hedger:
+    '''
+    Tail-latency control for idempotent GETs.
+    Once a request has taken longer than the given percentile of recent latencies for its endpoint,
+        a duplicate is sent and whichever response arrives first is used.
+    Latencies are kept per (api name, attribute name), so lc.spaces.item and lc.equipment.item
+        are timed separately.
+    The losing request is abandoned; it stops when its own timeout expires.
+    '''
+
+    def __init__(self, endpoints, percentile=95, minSamples=20, window=200, maxWorkers=4):
+        '''
+        :param endpoints: (api name, attribute name) pairs of the endpoints to hedge, like
+            {('spaces', 'seats'), ('hours', 'hours')}. A bare attribute name like 'item' matches it in every api.
+        :param percentile: float, latency percentile after which a duplicate is sent
+        :param minSamples: int, requests to observe per endpoint before hedging starts
+        :param window: int, recent latencies kept per endpoint
+        :param maxWorkers: int, duplicate requests in flight at once. When all are busy, no duplicate is sent.
+        '''
+        self.endpoints = {endpoint if isinstance(endpoint, str) else tuple(endpoint) for endpoint in endpoints}
+        self.percentile = percentile
+        self.minSamples = minSamples
+        self.window = window
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix='LibCalHedge')
+        self.stats = {'calls': 0, 'hedged': 0, 'hedgeWins': 0}
+        self._latencies = defaultdict(lambda: deque(maxlen=self.window))
+        self._slots = threading.BoundedSemaphore(maxWorkers)  # so duplicates never queue behind each other
+        self._lock = threading.Lock()
+
+    def _record(self, key, latency):
+        with self._lock:
+            self._latencies[key].append(latency)
+
+    def threshold(self, key):
+        '''
+        :param key: (api name, attribute name)
+        :return: float seconds, or None if not enough requests have been observed
+        '''
+        with self._lock:
+            latencies = sorted(self._latencies[key])
+        if len(latencies) < self.minSamples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))]
+
+    def _timed(self, key, fn, future):
+        '''
+        Run fn into future, recording its latency from the moment it is actually sent.
+        '''
+        if not future.set_running_or_notify_cancel():
+            return
+        startTime = time.monotonic()
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            self._record(key, time.monotonic() - startTime)
+
+    def call(self, apiName, name, fn):
+        '''
+        :param apiName: str, the name of the api, like 'spaces'
+        :param name: str, the endpoint attribute name
+        :param fn: function that sends the request and returns the response
+        :return: the first response to arrive
+        '''
+        key = (apiName, name)
+        if key not in self.endpoints and name not in self.endpoints:
+            return fn()
+
+        with self._lock:
+            self.stats['calls'] += 1
+
+        threshold = self.threshold(key)
+        if threshold is None:
+            startTime = time.monotonic()
+            resp = fn()
+            self._record(key, time.monotonic() - startTime)
+            return resp
+
+        # The primary is sent at once on its own thread, never queued behind the duplicates, and this
+        #     thread stays free to take whichever response arrives first.
+        primary = concurrent.futures.Future()
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._timed, key, fn, primary),
+            name='LibCalRequest',
+            daemon=True,
+        ).start()
+        futures = [primary]
+        pending = {primary}
+        error = None
+        try:
+            done, _ = concurrent.futures.wait(futures, timeout=_remaining(threshold))
+            if not done and self._slots.acquire(blocking=False):
+                with self._lock:
+                    self.stats['hedged'] += 1
+                duplicate = concurrent.futures.Future()
+                duplicate.add_done_callback(lambda future: self._slots.release())
+                try:
+                    self.executor.submit(contextvars.copy_context().run, self._timed, key, fn, duplicate)
+                except BaseException:
+                    duplicate.cancel()
+                    raise
+                futures.append(duplicate)
+                pending.add(duplicate)
+
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending,
+                    timeout=_remaining(),
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    if future.exception() is None:
+                        if future is not primary:
+                            with self._lock:
+                                self.stats['hedgeWins'] += 1
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class _JSONCodec:
+    '''
+    Decodes response bodies exactly once, using the fastest JSON library installed.
+    orjson is preferred, then ujson, then the standard library.
+    '''
+
+    def __init__(self, name=None):
+        '''
+        :param name: str like 'orjson', 'ujson' or 'json'. None means pick the fastest available.
+        '''
+        if name is None:
+            name = 'orjson' if orjson else 'ujson' if ujson else 'json'
+
+        if name == 'orjson' and orjson:
+            self.loads = orjson.loads
+        elif name == 'ujson' and ujson:
+            self.loads = ujson.loads
+        elif name == 'json':
+            self.loads = json.loads
+        else:
+            raise ValueError('JSON codec "{}" is not installed'.format(name))
+
+        self.name = name
+
+
+def _iter_json_array(chunks, loads=json.loads):
+    '''
+    Lazily decode a JSON array from an iterable of byte chunks, yielding one element at a time.
+    Only one element is held in memory at a time, so very large pages can be consumed
+        (or abandoned early) without decoding the whole body.
+    If the body is not an array, the whole document is decoded and yielded once.
+
+    :param chunks: iterable of bytes, like resp.iter_content(65536)
+    :param loads: function used to decode a body that is not an array
+    :return: generator
+    '''
+    decoder = json.JSONDecoder()
+    textDecoder = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    isArray = None
+    done = False
+    expect = 'first'  # 'first' element or ']', any other 'element', or the 'separator' after one
+
+    def parse(final):
+        nonlocal buf, pos, isArray, done, expect
+        while not done and isArray is not False:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos >= len(buf):
+                return
+
+            if isArray is None:
+                isArray = buf[pos] == '['
+                if not isArray:
+                    return
+                pos += 1
+                continue
+
+            if expect == 'separator' or (expect == 'first' and buf[pos] == ']'):
+                if buf[pos] == ']':
+                    done = True
+                    return
+                if buf[pos] != ',':
+                    raise ValueError('Expected "," or "]" at char {}: {!r}'.format(pos, buf[pos]))
+                pos += 1
+                expect = 'element'
+                continue
+
+            if buf[pos] in ',]':
+                raise ValueError('Expected an array element at char {}: {!r}'.format(pos, buf[pos]))
+
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if final:
+                    raise
+                return  # wait for more data
+
+            if buf[pos] not in '{["':
+                # a bare number/literal is only complete once the character after it has arrived,
+                #     "12" or "12." might continue as "12.5" in the next chunk
+                if end == len(buf) and not final:
+                    return
+                if end < len(buf) and buf[end] not in ',] \t\r\n':
+                    if final:
+                        raise ValueError('Invalid JSON array element at char {}: {!r}'.format(pos, buf[pos:end + 1]))
+                    return
+
+            pos = end
+            expect = 'separator'
+            yield item
+
+    for chunk in chunks:
+        buf = buf[pos:] + textDecoder.decode(chunk)
+        pos = 0
+        yield from parse(final=False)
+
+    buf = buf[pos:] + textDecoder.decode(b'', final=True)
+    pos = 0
+    if isArray is False or (isArray is None and buf.strip()):
+        yield loads(buf)
+        return
+
+    yield from parse(final=True)
+    if not done:
+        raise ValueError('Unterminated JSON array')
+
+
+def _stream_json_array(resp, loads=json.loads):
+    '''
+    _iter_json_array over a streamed response, closing the response once the generator
+        is exhausted, fails or is abandoned, so its connection goes back to the pool.
+    '''
+    try:
+        yield from _iter_json_array(resp.iter_content(chunk_size=65536), loads)
+    finally:
+        resp.close()
+
 
 class _TokenManager:
-    def __init__(self, clientID, clientSecret, apiURL, debug=False):
+    def __init__(self, clientID, clientSecret, apiURL, debug=False, codec=None, transport=None, timeout=None):
         self.clientID = clientID
         self.clientSecret = clientSecret
         self.apiURL = apiURL
         self.debug = debug
+        self.codec = codec or _JSONCodec()
+        self.transport = transport or requests
+        self.timeout = timeout
+        self._lock = threading.Lock()
 
         #
         self.dtExpiresAt = None
@@ -28,34 +351,808 @@ class _TokenManager:
             print(*a, **k)
 
     def GetAccessToken(self):
-        if self.access_token is None or datetime.datetime.now() > self.dtExpiresAt:
-            # get a new token
-            resp = requests.post(
-                url='{}1.1/oauth/token'.format(self.apiURL),
-                data={
-                    'client_id': self.clientID,
-                    'client_secret': self.clientSecret,
-                    'grant_type': 'client_credentials',
-                }
-            )
-            self.print('resp=', resp.text)
+        if self.access_token is not None and datetime.datetime.now() < self.dtExpiresAt:
+            return self.access_token
+
+        with self._lock:  # only one thread refreshes; the others wait and reuse its token
+            if self.access_token is None or datetime.datetime.now() > self.dtExpiresAt:
+                # get a new token
+                resp = self.transport.request(
+                    method='POST',
+                    url='{}1.1/oauth/token'.format(self.apiURL),
+                    data={
+                        'client_id': self.clientID,
+                        'client_secret': self.clientSecret,
+                        'grant_type': 'client_credentials',
+                    },
+                    timeout=_remaining(self.timeout),
+                )
+                if self.debug:
+                    self.print('resp=', resp.text)
 
-            if 'error' in resp.json():
-                raise PermissionError(str(resp.json()))
+                data = self.codec.loads(resp.content)
+                if 'error' in data:
+                    raise PermissionError(str(data))
 
-            elif resp.json().get('access_token', None):
-                self.access_token = resp.json()['access_token']
-                self.dtExpiresAt = datetime.datetime.now() + datetime.timedelta(seconds=resp.json()['expires_in'])
-                self.scope = resp.json()['scope']
+                elif data.get('access_token', None):
+                    self.access_token = data['access_token']
+                    self.dtExpiresAt = datetime.datetime.now() + datetime.timedelta(seconds=data['expires_in'])
+                    self.scope = data['scope']
 
         return self.access_token
 
 
+class LibCalError(Exception):
+    '''
+    Raised when the LibCal API answers with an error status.
+    '''
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(LibCalError):
+    '''
+    Raised instead of sending a request while an endpoint family's circuit breaker is open
+        and there is no last known good response to serve.
+    '''
+    pass
+
+
+class StaleList(list):
+    '''
+    A response served from the cache after it expired. stale is True and age is in seconds.
+    '''
+    stale = True
+    age = None
+
+
+class StaleDict(dict):
+    stale = True
+    age = None
+
+
+def _mark_stale(data, storedAt):
+    if isinstance(data, list):
+        data = StaleList(data)
+    elif isinstance(data, dict):
+        data = StaleDict(data)
+    else:
+        return data
+    data.age = time.time() - storedAt
+    return data
+
+
+class _CircuitBreaker:
+    '''
+    Opens after failureThreshold consecutive failures, so requests fail fast instead of piling onto
+        an API that is down. After resetTimeout seconds one trial request is let through (half-open);
+        if it succeeds the breaker closes, otherwise it opens again.
+    '''
+
+    def __init__(self, failureThreshold=5, resetTimeout=30):
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.failures = 0
+        self.openedAt = None
+        self._trialRunning = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.openedAt is None:
+            return 'closed'
+        if time.monotonic() - self.openedAt < self.resetTimeout:
+            return 'open'
+        return 'half-open'
+
+    def retryIn(self):
+        if self.openedAt is None:
+            return 0
+        return max(0, self.resetTimeout - (time.monotonic() - self.openedAt))
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trialRunning:
+                self._trialRunning = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.openedAt = None
+            self._trialRunning = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trialRunning or self.failures >= self.failureThreshold:
+                self.openedAt = time.monotonic()
+            self._trialRunning = False
+
+
+class _Resilience:
+    '''
+    State shared by all the endpoint groups of one LibCal: a circuit breaker per endpoint family
+        and the set of stale responses currently being refreshed in the background.
+    '''
+
+    def __init__(self, executor, staleGrace=0, failureThreshold=5, resetTimeout=30):
+        self.executor = executor
+        self.staleGrace = staleGrace
+        self.breakers = defaultdict(lambda: _CircuitBreaker(failureThreshold, resetTimeout))
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def refresh(self, key, fn):
+        '''
+        Run fn in the background unless a refresh for key is already running.
+        '''
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                fn()
+            except Exception:
+                pass  # the stale response stays in the cache
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self.executor.submit(contextvars.copy_context().run, run)
+
+
+def _new_session(maxConnections=32, maxHosts=10):
+    '''
+    A requests.Session whose connection pool is big enough to be shared by many threads.
+    Cookies are disabled; LibCal authenticates with bearer tokens, and a shared session must not
+        carry one client's cookies into another client's requests.
+    :param maxConnections: int, connections kept open per host
+    :param maxHosts: int, hosts whose connections are kept. See _fit_host_pools().
+    '''
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=maxHosts, pool_maxsize=maxConnections)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def _fit_host_pools(session, hosts, maxConnections=32):
+    '''
+    urllib3 keeps connection pools for only pool_connections hosts and closes the least recently used
+        one beyond that, so a session shared by more hosts would keep reconnecting.
+    Resize the adapters of session to keep pools for at least hosts hosts. Resizing drops the idle
+        connections once. Does nothing for transports that are not a requests.Session.
+    '''
+    for adapter in getattr(session, 'adapters', {}).values():
+        if isinstance(adapter, requests.adapters.HTTPAdapter) and adapter._pool_connections < hosts:
+            adapter._pool_connections = hosts
+            adapter.init_poolmanager(hosts, maxConnections, block=adapter._pool_block)
+
+
+class _ResponseCache:
+    '''
+    Thread-safe LRU cache of decoded GET responses.
+    Entries are partitioned by namespace so several clients can share one cache
+        without seeing each other's data.
+    Cached values are shared between callers and should be treated as read-only.
+    '''
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (namespace, key) -> (value, storedAt, expiresAt)
+
+    def lookup(self, namespace, key):
+        '''
+        :return: tuple like (value, storedAt, expiresAt) even if expired, or None
+        '''
+        with self._lock:
+            entry = self._entries.get((namespace, key), None)
+            if entry is not None:
+                self._entries.move_to_end((namespace, key))
+            return entry
+
+    def get(self, namespace, key):
+        '''
+        :return: the value if it has not expired, else None
+        '''
+        entry = self.lookup(namespace, key)
+        if entry is not None and time.time() < entry[2]:
+            return entry[0]
+        return None
+
+    def put(self, namespace, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._entries[(namespace, key)] = (value, now, now + ttl)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == namespace]:
+                    del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _TokenBucket:
+    '''
+    Blocks callers so that no more than rate requests per second are made on average,
+        with bursts of up to burst requests.
+    '''
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._tokens = self.burst
+        self._updatedAt = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updatedAt) * self.rate)
+                self._updatedAt = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    __call__ = acquire
+
+
+class _FairExecutor:
+    '''
+    A worker pool shared by many tenants.
+    Each tenant has its own queue, and idle workers take the next task round-robin across tenants,
+        so a tenant with thousands of queued tasks cannot starve one with a few.
+    A tenant can also be limited to maxConcurrent tasks running at once.
+    '''
+
+    def __init__(self, maxWorkers=8):
+        self.maxWorkers = maxWorkers
+        self._cond = threading.Condition()
+        self._queues = defaultdict(deque)  # tenant -> deque of (future, fn, a, k)
+        self._order = deque()  # tenants in round-robin order
+        self._running = defaultdict(int)
+        self._limits = {}
+        self._threads = []
+        self._shutdown = False
+
+    def set_limit(self, tenant, maxConcurrent=None):
+        with self._cond:
+            self._limits[tenant] = maxConcurrent
+            self._cond.notify_all()
+
+    def submit(self, tenant, fn, *a, **k):
+        future = concurrent.futures.Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError('cannot submit after shutdown')
+
+            if tenant not in self._queues:
+                self._order.append(tenant)
+            self._queues[tenant].append((future, contextvars.copy_context().run, (fn,) + a, k))
+
+            if len(self._threads) < self.maxWorkers:
+                thread = threading.Thread(target=self._worker, name='LibCalWorker', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def _next(self):
+        '''
+        Call with self._cond held.
+        :return: (tenant, task) or None
+        '''
+        for _ in range(len(self._order)):
+            tenant = self._order[0]
+            self._order.rotate(-1)
+            limit = self._limits.get(tenant, None)
+            if self._queues[tenant] and (limit is None or self._running[tenant] < limit):
+                self._running[tenant] += 1
+                return tenant, self._queues[tenant].popleft()
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                item = self._next()
+                while item is None:
+                    if self._shutdown and not any(self._queues.values()):
+                        return
+                    self._cond.wait()
+                    item = self._next()
+
+            tenant, (future, fn, a, k) = item
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*a, **k))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running[tenant] -= 1
+                    self._cond.notify_all()
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class _TenantExecutor:
+    '''
+    Looks like a concurrent.futures.Executor, but submits into one tenant's queue of a _FairExecutor.
+    '''
+
+    def __init__(self, fairExecutor, tenant):
+        self.fairExecutor = fairExecutor
+        self.tenant = tenant
+
+    def submit(self, fn, *a, **k):
+        return self.fairExecutor.submit(self.tenant, fn, *a, **k)
+
+    def map(self, fn, *iterables):
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+        for future in futures:
+            yield future.result()
+
+    def shutdown(self, wait=True):
+        pass  # owned by the pool
+
+
+class _InlineFuture:
+    '''
+    Work queued on an executor that runs exactly once: on a worker, or in the thread that asks for its
+        result() if no worker has started it yet.
+    Fan-out helpers wait on these from inside tasks of the same executor (lc.submit, LibCalPool.submit).
+        When every worker is busy with such a caller, the caller runs its own queued work instead of
+        waiting for a worker that will never come, so nested fan-outs cannot deadlock.
+    '''
+
+    def __init__(self, executor, fn, *a, **k):
+        context = contextvars.copy_context()
+        self._fn = lambda: context.run(fn, *a, **k)
+        self._claimed = False
+        self._lock = threading.Lock()
+        self._future = concurrent.futures.Future()
+        try:
+            executor.submit(self._run)
+        except RuntimeError:
+            pass  # executor shut down, result() runs it
+
+    def _claim(self):
+        with self._lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+            return True
+
+    def _run(self):
+        if self._claim() and self._future.set_running_or_notify_cancel():
+            try:
+                self._future.set_result(self._fn())
+            except BaseException as e:
+                self._future.set_exception(e)
+
+    def result(self, timeout=None):
+        self._run()
+        return self._future.result(timeout)
+
+    def cancel(self):
+        return self._claim() and self._future.cancel()
+
+
+class _ReplayResponse:
+    '''
+    Looks enough like a requests.Response for LibCal to use.
+    '''
+
+    def __init__(self, url, status_code, reason, content, latency=0):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.content = content
+        self.headers = {}
+        self.elapsed = datetime.timedelta(seconds=latency)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+class _Cassette:
+    '''
+    Shared by RecordingTransport and ReplayTransport.
+    A cassette is one JSON object per line, gzip compressed if the path ends with .gz
+    '''
+    secretKeys = ('client_secret',)
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'latency': 0.0, 'endpoints': defaultdict(int)}
+
+    def _open(self, mode):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode + 't', encoding='utf-8')
+        return open(self.path, mode, encoding='utf-8')
+
+    @classmethod
+    def _request(cls, method, url, kwargs):
+        data = kwargs.get('data', None)
+        if isinstance(data, dict):
+            data = {k: v for k, v in data.items() if k not in cls.secretKeys}
+        return {
+            'method': method.upper(),
+            'url': url,
+            'params': kwargs.get('params', None),
+            'json': kwargs.get('json', None),
+            'data': data,
+        }
+
+    def _count(self, method, url, latency):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['latency'] += latency
+            self.stats['endpoints']['{} {}'.format(method.upper(), url.split('?')[0])] += 1
+
+
+class RecordingTransport(_Cassette):
+    '''
+    Wraps another transport and appends every request/response pair to a cassette file,
+        so a real workload can be replayed offline with ReplayTransport.
+    Client secrets are never written, and access tokens are replaced with a placeholder.
+
+    Example:
+        with RecordingTransport('traversal.jsonl.gz') as transport:
+            lc = LibCal(..., transport=transport)
+            lc.find(seat_ids=[98])
+    '''
+
+    def __init__(self, path, transport=None):
+        '''
+        :param path: str, cassette file. Appended to if it already exists.
+        :param transport: the transport that makes the real requests. Defaults to a requests.Session.
+        '''
+        super().__init__(path)
+        self.transport = transport or requests.Session()
+        self._file = self._open('a')
+
+    def request(self, method, url, **kwargs):
+        startTime = time.perf_counter()
+        resp = self.transport.request(method=method, url=url, **kwargs)
+        content = resp.content  # reads a streamed body, which stays available through iter_content()
+        latency = time.perf_counter() - startTime
+
+        body = content.decode('utf-8', errors='replace')
+        if url.endswith('oauth/token') and resp.ok:
+            token = json.loads(body)
+            token['access_token'] = 'recorded'
+            body = json.dumps(token)
+
+        record = self._request(method, url, kwargs)
+        record.update({
+            'status': resp.status_code,
+            'reason': resp.reason,
+            'latency': round(latency, 6),
+            'body': body,
+        })
+        line = json.dumps(record, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+        self._count(method, url, latency)
+        return resp
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        self.close()
+
+
+class ReplayTransport(_Cassette):
+    '''
+    Serves responses from a cassette written by RecordingTransport, without touching the network.
+
+    match='exact' requires the same method, URL and parameters.
+    match='normalized' also treats every ISO date/datetime value as equal and ignores the
+        parameters in ignoreParams, so a workload captured on one day can be replayed on another.
+    Requests that were recorded more than once are answered in recorded order, repeating the last one.
+
+    After a run, stats holds the request count, the total (simulated) latency and the
+        requests per endpoint, for comparing runs between versions.
+    '''
+    _dateRegex = re.compile(r'^\d{4}-\d{2}-\d{2}([T ][\d:.]+([+-]\d{2}:?\d{2}|Z)?)?$')
+
+    def __init__(self, path, latencyScale=1.0, match='exact', ignoreParams=()):
+        '''
+        :param path: str, cassette file
+        :param latencyScale: float, multiplies the recorded latency. 0 replays as fast as possible.
+        :param match: str, 'exact' or 'normalized'
+        :param ignoreParams: names of parameters to leave out when match='normalized'
+        '''
+        super().__init__(path)
+        if match not in ('exact', 'normalized'):
+            raise ValueError('match must be "exact" or "normalized"')
+
+        self.latencyScale = latencyScale
+        self.match = match
+        self.ignoreParams = set(ignoreParams)
+        self.misses = []
+        self._recordings = defaultdict(list)
+        self._positions = defaultdict(int)
+
+        with self._open('r') as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    self._recordings[self._key(record)].append(record)
+
+    def _normalize(self, value):
+        if isinstance(value, dict):
+            return {k: self._normalize(v) for k, v in value.items() if k not in self.ignoreParams}
+        if isinstance(value, list):
+            return [self._normalize(v) for v in value]
+        if isinstance(value, str) and self._dateRegex.match(value):
+            return '<date>'
+        return value
+
+    def _key(self, request):
+        request = {k: request.get(k, None) for k in ('method', 'url', 'params', 'json', 'data')}
+        # values are compared the way they were sent, so 1 and '1' match
+        request = json.loads(json.dumps(request, default=str))
+        for k in ('params', 'json', 'data'):
+            if isinstance(request[k], dict):
+                request[k] = {name: str(v) if not isinstance(v, (dict, list)) else v for name, v in request[k].items()}
+        if self.match == 'normalized':
+            request = self._normalize(request)
+        return json.dumps(request, sort_keys=True)
+
+    def request(self, method, url, **kwargs):
+        key = self._key(self._request(method, url, kwargs))
+        with self._lock:
+            recordings = self._recordings.get(key, None)
+            if not recordings:
+                self.misses.append(key)
+                raise KeyError('No recorded response for {} {} {}'.format(method, url, kwargs.get('params', None)))
+            record = recordings[min(self._positions[key], len(recordings) - 1)]
+            self._positions[key] += 1
+
+        latency = record['latency'] * self.latencyScale
+        if latency:
+            time.sleep(latency)
+
+        self._count(method, url, latency)
+        return _ReplayResponse(
+            url=url,
+            status_code=record['status'],
+            reason=record['reason'],
+            content=record['body'].encode('utf-8'),
+            latency=latency,
+        )
+
+    def close(self):
+        pass
+
+
+_untrackedVar = contextvars.ContextVar('libcal_untracked', default=False)
+
+
+@contextlib.contextmanager
+def _untracked():
+    '''
+    Requests made inside this block are not counted by the access log. Used for internal fan-out
+        (paging, range pulls, polling, exports) so bulk traffic does not look like hot interactive requests.
+    '''
+    token = _untrackedVar.set(True)
+    try:
+        yield
+    finally:
+        _untrackedVar.reset(token)
+
+
+class _AccessLog:
+    '''
+    Counts GET calls per endpoint and arguments (leaving out date arguments for today),
+        so CacheWarmer knows which locations, spaces and categories are worth prefetching.
+    Only calls made directly by the application are counted, see _untracked().
+    '''
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._counts = {}  # key -> [count, apiName, attribute_name, kwargs]
+
+    def record(self, apiName, attribute_name, kwargs):
+        key = json.dumps([apiName, attribute_name, kwargs], sort_keys=True, default=str)
+        with self._lock:
+            entry = self._counts.get(key, None)
+            if entry is not None:
+                entry[0] += 1
+            elif len(self._counts) < self.maxsize:
+                self._counts[key] = [1, apiName, attribute_name, kwargs]
+
+    def top(self, n=None):
+        '''
+        :return: list of (count, apiName, attribute_name, kwargs), most frequent first
+        '''
+        with self._lock:
+            entries = sorted((tuple(entry) for entry in self._counts.values()), key=lambda entry: -entry[0])
+        return entries[:n]
+
+    def decay(self, factor=0.5):
+        '''
+        Scale every count down so recent days weigh more than old ones. Entries that drop below 1 are removed.
+        '''
+        with self._lock:
+            for key, entry in list(self._counts.items()):
+                entry[0] *= factor
+                if entry[0] < 1:
+                    del self._counts[key]
+
+    def __len__(self):
+        return len(self._counts)
+
+
+class _Index:
+    '''
+    Maps IDs to model objects so lookups by seat, space, category (cid), location (lid),
+        zone or booking ID are constant-time.
+    Parent links are kept as seat -> space -> category -> location, zone -> location
+        and booking -> seat/space, and can be walked in either direction.
+    Equipment uses its own kinds ('equipmentitem' -> 'equipmentcategory' -> 'equipmentlocation').
+    Models register themselves here as they are created by any traversal or response.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._objects = defaultdict(dict)  # kind -> {str(id): obj}
+        self._parents = {}  # (kind, id) -> (kind, id)
+        self._children = defaultdict(dict)  # (kind, id) -> {(kind, id): None, ...} in insertion order
+
+    @staticmethod
+    def _key(obj):
+        return type(obj).__name__.lower(), str(obj.id)
+
+    def add(self, obj, parent=None):
+        '''
+        :param obj: Location, Category, Space, Seat, Zone or Booking
+        :param parent: the model obj belongs to, or a (kind, id) tuple
+        :return: obj
+        '''
+        kind, ID = key = self._key(obj)
+
+        if parent is None and kind == 'booking':
+            if obj.get('seat_id', None):
+                parent = ('seat', obj['seat_id'])
+            elif obj.get('eid', None):
+                parent = ('space', obj['eid'])
+
+        if isinstance(parent, dict):
+            parent = self._key(parent)
+        elif parent is not None:
+            parent = (parent[0], str(parent[1]))
+
+        with self._lock:
+            self._objects[kind][ID] = obj
+            if parent is not None:
+                old = self._parents.get(key, None)
+                if old is not None and old != parent:
+                    self._children[old].pop(key, None)
+                self._parents[key] = parent
+                self._children[parent][key] = None
+
+        return obj
+
+    def get(self, kind, ID):
+        '''
+        :param kind: str like 'seat', 'space', 'category', 'location', 'zone' or 'booking'
+        :param ID: int or str
+        :return: the model, or None if it has not been seen yet
+        '''
+        return self._objects[kind].get(str(ID), None)
+
+    def parent(self, obj):
+        key = self._parents.get(self._key(obj), None)
+        return self.get(*key) if key else None
+
+    def ancestor(self, obj, kind):
+        '''
+        Walk up the parent links, like index.ancestor(seat, 'location').
+        '''
+        while obj is not None:
+            obj = self.parent(obj)
+            if obj is not None and type(obj).__name__.lower() == kind:
+                return obj
+        return None
+
+    def children(self, obj, kind=None):
+        with self._lock:
+            keys = list(self._children.get(self._key(obj), ()))
+        return [
+            self.get(*key) for key in keys
+            if (kind is None or key[0] == kind) and self.get(*key) is not None
+        ]
+
+    def __len__(self):
+        return sum(len(objects) for objects in self._objects.values())
+
+
 class _BaseAPI:
-    def __init__(self, baseURL, tokenCallback, debug=False):
+    def __init__(
+            self,
+            baseURL,
+            tokenCallback,
+            debug=False,
+            codec=None,
+            transport=None,
+            throttle=None,
+            cache=None,
+            cacheTTL=0,
+            cacheNamespace=None,
+            timeout=None,
+            hedger=None,
+            resilience=None,
+            name=None,
+            accessLog=None,
+    ):
         self.baseURL = baseURL
         self.tokenCallback = tokenCallback
         self.debug = debug
+        self.codec = codec or _JSONCodec()
+        self.transport = transport or requests
+        self.throttle = throttle
+        self.cache = cache
+        self.cacheTTL = cacheTTL
+        self.cacheNamespace = cacheNamespace or baseURL
+        self.timeout = timeout
+        self.hedger = hedger
+        self.resilience = resilience
+        self.name = name or type(self).__name__.strip('_').lower()
+        self.accessLog = accessLog
+        self.dateParams = {}  # attribute_name -> names of the params that default to today
 
         #
 
@@ -63,44 +1160,171 @@ class _BaseAPI:
         if self.debug:
             print(*a, **k)
 
-    def send_request(self, method, url, params=None, json=None):
-        if params is None and json is not None:
-            params = json
+    def send_request(self, method, url, params=None, json=None, stream=False):
+        # build new dicts rather than converting the caller's in place, the caller may share them between threads
+        def convert(values):
+            ret = {}
+            for k, v in values.items():
+                if isinstance(v, bool):
+                    v = int(v)  # booleans are passed as int 0/1
+                if isinstance(v, (datetime.datetime, datetime.date)):
+                    v = v.isoformat()
+                ret[k] = v
+            return ret
 
-        for k, v in params.items():
-            if isinstance(v, bool):
-                params[k] = int(v)  # booleans are passed as int 0/1
-            if isinstance(v, (datetime.datetime, datetime.date)):
-                params[k] = v.isoformat()
+        if json is not None:
+            json = convert(json)
+            if params is None:
+                params = json
+        elif params is not None:
+            params = convert(params)
 
         self.print('send_request(', method, url, params, json)
 
-        resp = requests.request(
-            method=method,
-            url=url,
-            params=params,
-            json=json,
-            headers={
-                'Authorization': 'Bearer {}'.format(self.tokenCallback())
-            }
-        )
+        if self.throttle:
+            self.throttle()
+
+        headers = {
+            'Authorization': 'Bearer {}'.format(self.tokenCallback())
+        }
+        try:
+            resp = self.transport.request(
+                method=method,
+                url=url,
+                params=params,
+                json=json,
+                headers=headers,
+                stream=stream,
+                timeout=_remaining(self.timeout),
+            )
+        except requests.exceptions.Timeout as e:
+            _remaining()  # raises DeadlineExceeded if that is why the request timed out
+            raise e
         return resp
 
+    def _call(self, attribute_name, family, method, url, params, stream=False):
+        '''
+        Send one request and decode the response.
+        Any exception raised while sending (connection errors, timeouts, deadlines) and 429/5xx responses
+            count as failures for the family's circuit breaker.
+        :return: decoded response, or a generator if stream=True
+        '''
+        breaker = self.resilience.breakers[family] if self.resilience else None
+        if breaker and not breaker.allow():
+            raise CircuitOpenError('Circuit open for "{}" endpoints, retry in {:.0f}s'.format(
+                family, breaker.retryIn()))
+
+        try:
+            if method == 'GET':
+                def send():
+                    return self.send_request(
+                        url=url,
+                        method=method,
+                        params=params,
+                        stream=stream,
+                    )
+
+                if self.hedger and not stream:
+                    resp = self.hedger.call(self.name, attribute_name, send)
+                else:
+                    resp = send()
+
+            elif method == 'POST':
+                resp = self.send_request(
+                    url=url,
+                    method=method,
+                    json=params,
+                    stream=stream,
+                )
+
+        except BaseException:
+            # Anything else (DeadlineExceeded, token errors, ...) counts too, so a half-open trial always ends
+            if breaker:
+                breaker.failure()
+            raise
+
+        if breaker:
+            if resp.status_code == 429 or resp.status_code >= 500:
+                breaker.failure()
+            else:
+                breaker.success()
+
+        if resp.ok:
+            if stream:
+                return _stream_json_array(resp, self.codec.loads)
+
+            data = self.codec.loads(resp.content)
+            self.print(attribute_name, 'resp.json()=', data)
+            self.print()
+            return data
+        else:
+            raise LibCalError('{} {}: {}'.format(
+                resp.status_code,
+                resp.reason,
+                resp.text
+            ), status_code=resp.status_code)
+
+    def _cached_get(self, attribute_name, family, url, params):
+        '''
+        GET through the response cache.
+        With resilience enabled, a response that is past its TTL but inside the stale grace window
+            is returned at once while it is refreshed in the background, and the last known good
+            response is returned (marked stale) when the request fails or the circuit is open.
+        '''
+        cacheKey = self._cache_key(url, params)
+        entry = self.cache.lookup(self.cacheNamespace, cacheKey)
+        if entry is not None:
+            data, storedAt, expiresAt = entry
+            now = time.time()
+            if now < expiresAt:
+                self.print(attribute_name, 'cache hit', cacheKey)
+                return data
+
+            if self.resilience and now < expiresAt + self.resilience.staleGrace:
+                self.print(attribute_name, 'stale cache hit, refreshing', cacheKey)
+                self.resilience.refresh(cacheKey, lambda: self._store(
+                    cacheKey, self._call(attribute_name, family, 'GET', url, params)))
+                return _mark_stale(data, storedAt)
+
+        try:
+            return self._store(cacheKey, self._call(attribute_name, family, 'GET', url, params))
+        except (requests.exceptions.RequestException, LibCalError) as e:
+            if self.resilience and entry is not None and (
+                    not isinstance(e, LibCalError) or isinstance(e, CircuitOpenError) or e.status_code >= 500
+                    or e.status_code == 429):
+                self.print(attribute_name, 'serving last known good response after', repr(e))
+                return _mark_stale(entry[0], entry[1])
+            raise
+
+    def _store(self, cacheKey, data, ttl=None):
+        self.cache.put(self.cacheNamespace, cacheKey, data, self.cacheTTL if ttl is None else ttl)
+        return data
+
+    @staticmethod
+    def _cache_key(url, params):
+        return '{}?{}'.format(url, sorted((k, str(v)) for k, v in params.items()))
+
     def _add_endpoint(
             self,
             endpoint,
             method='GET',
-            defaultParams={},
+            defaultParams=None,
             attribute_name=None,
             endpointCallback=None,
-            requiredParams=[],
+            requiredParams=None,
     ):
         '''
 
         :param endpoint: str like '/space/locations'
         :param methods: list like ['GET", 'POST']
-        :param defaultParams: dict like {'admin_only': 'defaultvalue'}
+        :param defaultParams: dict like {'admin_only': 'defaultvalue'}.
+            A callable value, like datetime.date.today, is called each time the endpoint is used.
         :return:
+
+        The generated method accepts stream=True to return a generator that decodes a
+            list response one element at a time instead of all at once,
+            timeout=seconds to limit the whole call (see deadline()),
+            and cacheTTL=seconds to fetch a fresh response and cache it for that long (see CacheWarmer).
         '''
         if attribute_name is None:
             attribute_name = endpoint.split('/')[-1]
@@ -112,23 +1336,43 @@ class _BaseAPI:
                         attribute_name = attribute_name.replace(ch, '')
 
         self.print('attribute_name=', attribute_name)
+        defaultParams = types.MappingProxyType(dict(defaultParams or {}))  # read-only, shared by every call
+        requiredParams = tuple(requiredParams or ())
+        family = endpoint.split('1.1/')[-1].split('/')[0]  # like 'space' or 'hours', for the circuit breaker
+        self.dateParams[attribute_name] = tuple(k for k, v in defaultParams.items() if v == datetime.date.today)
 
         def new_method(endpoint=endpoint, method=method, defaultParams=defaultParams, endpointCallback=endpointCallback,
-                       attribute_name=attribute_name, requiredParams=requiredParams, **kwargs):
+                       attribute_name=attribute_name, requiredParams=requiredParams, stream=False, timeout=None,
+                       cacheTTL=None, **kwargs):
+
+            if timeout is not None:
+                with deadline(timeout):
+                    return new_method(stream=stream, cacheTTL=cacheTTL, **kwargs)
 
             method = method.upper()
 
+            if (self.accessLog is not None and method == 'GET' and not stream and cacheTTL is None
+                    and not _untrackedVar.get()):
+                today = datetime.date.today()
+                self.accessLog.record(self.name, attribute_name, {
+                    k: v for k, v in kwargs.items()
+                    if k not in self.dateParams[attribute_name] or v not in (today, today.isoformat())
+                })
+
             if endpointCallback:
                 endpoint = endpointCallback(endpoint, **kwargs)
 
-            params = defaultParams.copy()
-            for k, v in params.copy().items():
+            params = {}
+            for k, v in defaultParams.items():
+                if callable(v):
+                    v = v()
                 if v is None:
-                    params.pop(k, None)
+                    continue
                 if isinstance(v, (datetime.date,)):
-                    params[k] = v.isoformat()
+                    v = v.isoformat()
                 elif isinstance(v, list):
-                    params[k] = ','.join(a for a in v)
+                    v = ','.join(a for a in v)
+                params[k] = v
 
             params.update(kwargs)
 
@@ -138,30 +1382,15 @@ class _BaseAPI:
                 else:
                     params[req] = kwargs[req]
 
-            if method == 'GET':
-                resp = self.send_request(
-                    url='{}{}'.format(self.baseURL, endpoint),
-                    method=method,
-                    params=params,
-                )
+            url = '{}{}'.format(self.baseURL, endpoint)
+            if method == 'GET' and cacheTTL is not None and self.cache is not None:
+                data = self._call(attribute_name, family, method, url, params)
+                return self._store(self._cache_key(url, params), data, ttl=cacheTTL)
 
-            elif method == 'POST':
-                resp = self.send_request(
-                    url='{}{}'.format(self.baseURL, endpoint),
-                    method=method,
-                    json=params,
-                )
+            if method == 'GET' and not stream and self.cache is not None and (self.cacheTTL or self.resilience):
+                return self._cached_get(attribute_name, family, url, params)
 
-            if resp.ok:
-                self.print(attribute_name, 'resp.json()=', resp.json())
-                self.print()
-                return resp.json()
-            else:
-                raise Exception('{} {}: {}'.format(
-                    resp.status_code,
-                    resp.reason,
-                    resp.text
-                ))
+            return self._call(attribute_name, family, method, url, params, stream=stream)
 
         setattr(self, attribute_name, new_method)
 
@@ -202,7 +1431,7 @@ class _Spaces(_BaseAPI):
             requiredParams=['cid'],
             defaultParams={
                 'details': False,
-                'availability': datetime.date.today(),
+                'availability': datetime.date.today,
             }
         )
         self._add_endpoint(
@@ -214,7 +1443,7 @@ class _Spaces(_BaseAPI):
             ),
             requiredParams=['ids'],
             defaultParams={
-                'availability': datetime.date.today(),
+                'availability': datetime.date.today,
             }
         )
         self._add_endpoint(
@@ -275,7 +1504,7 @@ class _Spaces(_BaseAPI):
                 'cid': None,
                 'lid': None,
                 'email': None,
-                'date': datetime.date.today(),
+                'date': datetime.date.today,
                 'days': 1,
                 'limit': 20,
                 'page': 1,
@@ -313,7 +1542,7 @@ class _Spaces(_BaseAPI):
                 'zoneId': None,
                 'accessibleOnly': False,
                 'powered': False,
-                'availability': datetime.date.today(),
+                'availability': datetime.date.today,
                 'pageIndex': 0,
                 'pageSize': 20,
             }
@@ -393,6 +1622,30 @@ class _Appointments(_BaseAPI):
                 'limit': 20,
             }
         )
+        self._add_endpoint(
+            attribute_name='booking',
+            endpoint='1.1/appointments/booking/{ids}',
+            endpointCallback=lambda endp, **kw: endp.format(
+                ids=kw['ids'] if isinstance(kw['ids'], (int, str)) else ','.join(str(i) for i in kw['ids']),
+            ),
+            method='GET',
+            requiredParams=['ids'],
+        )
+        self._add_endpoint(
+            attribute_name='bookings',
+            endpoint='1.1/appointments/bookings',
+            method='GET',
+            defaultParams={
+                'user_id': None,
+                'location_id': None,
+                'group_id': None,
+                'category_id': None,
+                'date': datetime.date.today,
+                'days': 1,
+                'limit': 20,
+                'page': 1,
+            }
+        )
 
 
 class _Equipment(_BaseAPI):
@@ -404,6 +1657,89 @@ class _Equipment(_BaseAPI):
             endpoint='1.1/equipment/locations',
             defaultParams={'details': False, 'admin_only': False},
         )
+        self._add_endpoint(
+            attribute_name='categories',
+            endpoint='1.1/equipment/categories/{ids}',
+            method='GET',
+            endpointCallback=lambda endpoint, ids: endpoint.format(
+                ids=','.join(str(i) for i in ids) if isinstance(ids, list) else ids),
+            defaultParams={'admin_only': False}
+        )
+        self._add_endpoint(
+            attribute_name='category',
+            endpoint='1.1/equipment/category/{cid}',
+            method='GET',
+            endpointCallback=lambda endp, **kw: endp.format(**kw),
+            requiredParams=['cid'],
+            defaultParams={
+                'details': False,
+                'availability': datetime.date.today,
+            }
+        )
+        self._add_endpoint(
+            attribute_name='item',
+            endpoint='1.1/equipment/item/{ids}',
+            method='GET',
+            endpointCallback=lambda endp, **kw: endp.format(
+                ids=kw['ids'] if isinstance(kw['ids'], (int, str)) else ','.join(str(i) for i in kw['ids']),
+            ),
+            requiredParams=['ids'],
+            defaultParams={
+                'availability': datetime.date.today,
+            }
+        )
+        self._add_endpoint(
+            attribute_name='reserve',
+            method='POST',
+            endpoint='1.1/equipment/reserve',
+            requiredParams=[
+                'start',
+                'fname',
+                'lname',
+                'email',
+                'bookings',
+            ],
+            defaultParams={
+                'nickname': None,
+                'adminbooking': False,
+                'test': False,
+            }
+        )
+        self._add_endpoint(
+            attribute_name='booking',
+            endpoint='1.1/equipment/booking/{ids}',
+            endpointCallback=lambda endp, **kw: endp.format(
+                ids=kw['ids'] if isinstance(kw['ids'], (int, str)) else ','.join(str(i) for i in kw['ids']),
+            ),
+            method='GET',
+            requiredParams=['ids'],
+            defaultParams={
+                'formAnswers': None,  # bool
+            }
+        )
+        self._add_endpoint(
+            endpoint='1.1/equipment/bookings',
+            method='GET',
+            defaultParams={
+                'eid': None,
+                'cid': None,
+                'lid': None,
+                'email': None,
+                'date': datetime.date.today,
+                'days': 1,
+                'limit': 20,
+                'page': 1,
+                'formAnswers': False,
+            }
+        )
+        self._add_endpoint(
+            attribute_name='cancel',
+            method='POST',
+            endpoint='1.1/equipment/cancel/{ids}',
+            endpointCallback=lambda endp, **kw: endp.format(
+                ids=kw['ids'] if isinstance(kw['ids'], (int, str)) else ','.join(str(i) for i in kw['ids']),
+            ),
+        )
 
 
 class _Events(_BaseAPI):
@@ -415,7 +1751,7 @@ class _Events(_BaseAPI):
             endpoint='1.1/events',
             requiredParams=['cal_id'],
             defaultParams={
-                'date': datetime.date.today(),
+                'date': datetime.date.today,
                 'days': 30,
                 'limit': 20,
                 'campus': None,
@@ -448,25 +1784,95 @@ class _Hours(_BaseAPI):
             endpointCallback=lambda endp, **kw: endp.format(
                 ids=kw['ids'] if isinstance(kw['ids'], (int, str)) else ','.join(str(i) for i in kw['ids'])),
             defaultParams={
-                'from': datetime.date.today(),
-                'to': datetime.date.today(),
+                'from': datetime.date.today,
+                'to': datetime.date.today,
             }
         )
 
 
-class Location(dict):
-    @property
-    def categories(self):
-        ret = []
-        categoryResults = self['parent'].spaces.categories(ids=self['lid'])
-        for result in categoryResults:
-            if result['lid'] == self['lid']:
-                for cat in result['categories']:
-                    ret.append(Category(
-                        parent=self['parent'],
-                        location_name=self['name'],
-                        **cat
-                    ))
+class _Availability:
+    '''
+    Parsed, sorted availability slots with binary-search lookups.
+    Built once per availability list instead of parsing every slot on every check.
+    Slots are assumed not to overlap, which is how LibCal returns them.
+    '''
+
+    def __init__(self, availability):
+        self.slots = sorted(
+            (datetime.datetime.fromisoformat(fromTo['from']), datetime.datetime.fromisoformat(fromTo['to']))
+            for fromTo in availability
+        )
+        self.starts = [from_ for from_, to in self.slots]
+
+    def contains(self, dt, strict=False):
+        '''
+        :param dt: timezone aware datetime
+        :param strict: bool, True means from < dt < to, False means from <= dt <= to
+        '''
+        if strict:
+            i = bisect.bisect_left(self.starts, dt) - 1
+            return i >= 0 and dt < self.slots[i][1]
+        i = bisect.bisect_right(self.starts, dt) - 1
+        return i >= 0 and dt <= self.slots[i][1]
+
+    def slot_at(self, dt):
+        '''
+        :return: the (from, to) slot with from <= dt < to, or None
+        '''
+        i = bisect.bisect_right(self.starts, dt) - 1
+        if i >= 0 and dt < self.slots[i][1]:
+            return self.slots[i]
+        return None
+
+    def slot_ending(self, dt):
+        '''
+        :return: the (from, to) slot with from < dt <= to, or None
+        '''
+        i = bisect.bisect_left(self.starts, dt) - 1
+        if i >= 0 and dt <= self.slots[i][1]:
+            return self.slots[i]
+        return None
+
+    def covers(self, start, end):
+        '''
+        :return: True if back-to-back slots cover all of start to end
+        '''
+        i = bisect.bisect_right(self.starts, start) - 1
+        if i < 0 or self.slots[i][1] <= start:
+            return False
+        while self.slots[i][1] < end:
+            if i + 1 >= len(self.slots) or self.slots[i + 1][0] != self.slots[i][1]:
+                return False
+            i += 1
+        return True
+
+
+def _availability_index(model):
+    '''
+    :param model: Space, Seat or anything else with an 'availability' list
+    :return: _Availability, cached on the model until its availability list is replaced
+    '''
+    cached = model.__dict__.get('_availabilityIndex', None)
+    availability = model.get('availability', None) or []
+    if cached is None or cached[0] is not availability:
+        cached = (availability, _Availability(availability))
+        model.__dict__['_availabilityIndex'] = cached
+    return cached[1]
+
+
+class Location(dict):
+    @property
+    def categories(self):
+        ret = []
+        categoryResults = self['parent'].spaces.categories(ids=self['lid'])
+        for result in categoryResults:
+            if result['lid'] == self['lid']:
+                for cat in result['categories']:
+                    ret.append(self['parent'].index.add(Category(
+                        parent=self['parent'],
+                        location_name=self['name'],
+                        **cat
+                    ), parent=self))
         return ret
 
     @property
@@ -476,12 +1882,23 @@ class Location(dict):
             spacesResults = self['parent'].spaces.category(cid=cat['cid'])
             for result in spacesResults:
                 for space in result['items']:
-                    ret.append(Space(
+                    ret.append(self['parent'].index.add(Space(
                         parent=self['parent'],
                         lid=self.id,
                         location_name=self['name'],
                         **space
-                    ))
+                    ), parent=cat))
+        return ret
+
+    @property
+    def zones(self):
+        ret = []
+        for zone in self['parent'].spaces.zones(location_id=self.id):
+            ret.append(self['parent'].index.add(Zone(
+                parent=self['parent'],
+                location_name=self['name'],
+                **zone
+            ), parent=self))
         return ret
 
     @property
@@ -513,41 +1930,60 @@ class Category(dict):
         return str(self)
 
 
+class Zone(dict):
+
+    @property
+    def id(self):
+        return self['id']
+
+    def __str__(self):
+        return '<{}: name={}, id={}, location_name={}>'.format(
+            type(self).__name__,
+            self.get('name', None),
+            self.id,
+            self['location_name'],
+        )
+
+    def __repr__(self):
+        return str(self)
+
+
 class Space(dict):
 
     def is_available_at(self, dt=None):
         dt = dt or datetime.datetime.now().astimezone()
-
-        for fromTo in self['availability']:
-            from_ = datetime.datetime.fromisoformat(
-                fromTo['from']
-            )
-            to = datetime.datetime.fromisoformat(
-                fromTo['to']
-            )
-            if from_ < dt < to:
-                return True
-
-        return False
+        return _availability_index(self).contains(dt, strict=True)
 
     @property
     def seats(self):
         if self['isBookableAsWhole'] is True:
             return []
+        return self._get_seats()
 
+    def _get_seats(self, **params):
+        '''
+        Every seat of this space, paging through spaces.seats.
+        :param params: passed to spaces.seats, like availability=datetime.date(2024, 1, 8)
+        '''
+        lc = self['parent']
         ret = []
-        seats = self['parent'].spaces.seats(
+        seats = lc.pages(
+            lc.spaces.seats,
+            pageKey='pageIndex',
+            sizeKey='pageSize',
+            firstPage=0,
             location_id=self['lid'],
             spaceId=self['id'],
+            **params
         )
         for seat in seats:
-            ret.append(Seat(
+            ret.append(self['parent'].index.add(Seat(
                 parent=self['parent'],
                 space_id=self.id,
                 space_name=self['name'],
                 location_name=self['location_name'],
                 **seat
-            ))
+            ), parent=self))
 
         return ret
 
@@ -571,26 +2007,15 @@ class Space(dict):
         startDT = startDT or datetime.datetime.now().astimezone()
 
         # the startDT must match one of the availability slots
-        for fromTo in self['availability']:
-            from_ = datetime.datetime.fromisoformat(
-                fromTo['from']
-            )
-            to = datetime.datetime.fromisoformat(
-                fromTo['to']
-            )
+        slots = _availability_index(self).slots
+        for from_, to in slots:
             if from_ <= startDT < to:
                 startDT = from_
                 break
 
         # the endDT must match one of the availability slots
         endDT = endDT or startDT
-        for fromTo in self['availability']:
-            from_ = datetime.datetime.fromisoformat(
-                fromTo['from']
-            )
-            to = datetime.datetime.fromisoformat(
-                fromTo['to']
-            )
+        for from_, to in slots:
             if from_ <= endDT <= to:
                 endDT = to
                 break
@@ -609,21 +2034,164 @@ class Space(dict):
             bookings=[booking],
         )
 
-        return Booking(
+        return self['parent'].index.add(Booking(
             parent=self['parent'],
             **resp,
+        ), parent=self)
+
+    def reserve_seats(self, count, fname, lname, email, startDT=None, endDT=None, zone_id=None, sameZone=False):
+        '''
+        Book several seats in this space for the same time with one reserve request.
+
+        Seats that share a zone are preferred, then seats whose IDs are closest together.
+        If startDT is not given, the earliest slot from now where enough seats are free is used.
+        If LibCal books only some of the seats, the ones that were booked are cancelled
+            with one cancel request and an exception is raised, naming any booking that
+            could not be cancelled.
+
+        :param count: int, number of seats
+        :param startDT: datetime, must fall inside a slot that count seats have free
+        :param endDT: datetime, defaults to the end of the starting slot
+        :param zone_id: only consider seats in this zone
+        :param sameZone: bool, True means fail rather than split the group across zones
+        :return: list of Booking
+        '''
+        lc = self['parent']
+        params = {'zoneId': zone_id}
+        if startDT is not None:
+            params['availability'] = startDT.date()  # the seats default to today's availability
+        seats = self._get_seats(**params)
+        if startDT is not None and startDT.tzname() is None:
+            startDT = startDT.astimezone()
+        if endDT is not None and endDT.tzname() is None:
+            endDT = endDT.astimezone()
+
+        # every slot start is a candidate; with an explicit startDT only the slot containing it is
+        now = datetime.datetime.now().astimezone()
+        starts = set()
+        for seat in seats:
+            index = _availability_index(seat)
+            if startDT is None:
+                starts.update(from_ for from_, to in index.slots if to > now)
+            else:
+                slot = index.slot_at(startDT)
+                if slot:
+                    starts.add(slot[0])
+
+        for start in sorted(starts):
+            end = None
+            for seat in seats:
+                index = _availability_index(seat)
+                slot = index.slot_ending(endDT) if endDT else index.slot_at(start)
+                if slot and (end is None or slot[1] < end):
+                    end = slot[1]
+            if end is None or end <= start:
+                continue
+
+            chosen = self._pick_seats(
+                [seat for seat in seats if _availability_index(seat).covers(start, end)],
+                count,
+                sameZone,
+            )
+            if chosen:
+                break
+        else:
+            raise ValueError('{} seats are not free at the same time in {}'.format(count, self['name']))
+
+        resp = lc.spaces.reserve(
+            start=start,
+            fname=fname,
+            lname=lname,
+            email=email,
+            bookings=[
+                {'id': self.id, 'to': end.isoformat(), 'seat_id': seat.id}
+                for seat in chosen
+            ],
         )
 
+        # LibCal answers with one booking_id for the whole request, a comma separated list,
+        # or per-booking results; anything less than a full set is rolled back
+        results = resp if isinstance(resp, list) else resp.get('bookings', None) or [resp]
+        bookingIDs = []
+        failed = []
+        for result in results:
+            IDs = result.get('booking_id', None) or result.get('bookId', None)
+            if IDs and not result.get('error', None):
+                bookingIDs.extend(str(IDs).split(','))
+            else:
+                failed.append(result)
+
+        if failed or not bookingIDs:
+            kept = []
+            if bookingIDs:
+                try:
+                    cancelled = lc.spaces.cancel(ids=bookingIDs)
+                except LibCalError:
+                    kept = bookingIDs
+                else:
+                    byID = {str(item.get('booking_id', None)): item for item in cancelled}
+                    kept = [ID for ID in bookingIDs if not byID.get(ID, {}).get('cancelled', False)]
+            if kept:
+                raise LibCalError('Group booking failed and these bookings could not be cancelled: {}: {}'.format(
+                    ', '.join(kept), failed or resp))
+            raise LibCalError('Group booking failed and was rolled back: {}'.format(failed or resp))
+
+        # the seats are taken now; keep the local availability in step without another request
+        for seat in chosen:
+            seat['availability'] = [
+                fromTo for fromTo in seat['availability']
+                if not (start <= datetime.datetime.fromisoformat(fromTo['from']) < end)
+            ]
+
+        extra = {k: v for k, v in resp.items() if k not in ('booking_id', 'bookings')} if isinstance(resp, dict) else {}
+        return [
+            lc.index.add(Booking(parent=lc, booking_id=ID, **extra), parent=self)
+            for ID in bookingIDs
+        ]
+
+    @staticmethod
+    def _pick_seats(seats, count, sameZone=False):
+        '''
+        :return: count seats, from one zone if possible, with the smallest spread of IDs, or None
+        '''
+        if len(seats) < count:
+            return None
+
+        def position(seat):
+            ID = str(seat.id)
+            return int(ID) if ID.isdigit() else 0
+
+        def closest(group):
+            group = sorted(group, key=lambda seat: (position(seat), str(seat.id)))
+            best = None
+            for i in range(len(group) - count + 1):
+                window = group[i:i + count]
+                spread = position(window[-1]) - position(window[0])
+                if best is None or spread < best[0]:
+                    best = (spread, window)
+            return best
+
+        zones = defaultdict(list)
+        for seat in seats:
+            zones[seat.get('zoneId', None)].append(seat)
+
+        options = [closest(group) for group in zones.values() if len(group) >= count]
+        if options:
+            return min(options, key=lambda option: option[0])[1]
+        if sameZone:
+            return None
+        return closest(seats)[1]
+
     @property
     def bookings(self):
         ret = []
         for booking in self['parent'].spaces.bookings(
                 eid=self.id,
         ):
-            ret.append(Booking(
+            ret.append(self['parent'].index.add(Booking(
                 parent=self['parent'],
                 **booking,
-            ))
+            )))
         return ret
 
     def __str__(self):
@@ -645,17 +2213,7 @@ class Seat(dict):
         if dt.tzname() is None:
             dt = dt.astimezone()
 
-        for fromTo in self['availability']:
-            from_ = datetime.datetime.fromisoformat(
-                fromTo['from']
-            )
-            to = datetime.datetime.fromisoformat(
-                fromTo['to']
-            )
-            if from_ <= dt <= to:
-                return True
-
-        return False
+        return _availability_index(self).contains(dt)
 
     @property
     def id(self):
@@ -679,13 +2237,8 @@ class Seat(dict):
         assert self.is_available_at(startDT), 'This seat is not available at startDT={}'.format(startDT)
 
         # the startDT must match one of the availability slots
-        for fromTo in self['availability']:
-            from_ = datetime.datetime.fromisoformat(
-                fromTo['from']
-            )
-            to = datetime.datetime.fromisoformat(
-                fromTo['to']
-            )
+        slots = _availability_index(self).slots
+        for from_, to in slots:
             if from_ <= startDT < to:
                 startDT = from_
                 break
@@ -697,13 +2250,7 @@ class Seat(dict):
 
         assert self.is_available_at(endDT), 'This seat is not available at endDT={}'.format(endDT)
 
-        for fromTo in self['availability']:
-            from_ = datetime.datetime.fromisoformat(
-                fromTo['from']
-            )
-            to = datetime.datetime.fromisoformat(
-                fromTo['to']
-            )
+        for from_, to in slots:
             if from_ <= endDT <= to and to > startDT:
                 endDT = to
                 break
@@ -723,10 +2270,10 @@ class Seat(dict):
             bookings=[booking],
         )
 
-        return Booking(
+        return self['parent'].index.add(Booking(
             parent=self['parent'],
             **resp,
-        )
+        ), parent=self)
 
     @property
     def bookings(self):
@@ -734,10 +2281,10 @@ class Seat(dict):
         for booking in self['parent'].spaces.bookings(
                 seat_id=self.id,
         ):
-            ret.append(Booking(
+            ret.append(self['parent'].index.add(Booking(
                 parent=self['parent'],
                 **booking,
-            ))
+            )))
         return ret
 
     def __str__(self):
@@ -755,6 +2302,7 @@ class Seat(dict):
 
 
 class Booking(dict):
+    _api = 'spaces'
 
     def __str__(self):
         return '<{}: id={}, start={}, end={}, location_name={}, space_name={}, {}{}{}email={}>'.format(
@@ -774,10 +2322,15 @@ class Booking(dict):
         return str(self)
 
     def _update(self):
-        for booking in self['parent'].spaces.booking(ids=self.id):
-            if booking['bookId'] == self.id or booking['booking_id'] == self.id:
-                print('777 booking=', booking)
-                self.update(booking)
+        byID = {}
+        for booking in getattr(self['parent'], self._api).booking(ids=self.id):
+            byID[str(booking.get('bookId', booking.get('booking_id', None)))] = booking
+
+        booking = byID.get(str(self.id), None)
+        if booking:
+            self['parent'].print('_update booking=', booking)
+            self.update(booking)
+            self['parent'].index.add(self)
 
     @property
     def id(self):
@@ -825,14 +2378,203 @@ class Booking(dict):
         return self['email']
 
     def cancel(self):
-        resp = self['parent'].spaces.cancel(ids=self.id)
-        for item in resp:
-            if item.get('booking_id', None) == self.id:
-                self.update(item)
+        resp = getattr(self['parent'], self._api).cancel(ids=self.id)
+        byID = {str(item.get('booking_id', None)): item for item in resp}
+        if str(self.id) in byID:
+            self.update(byID[str(self.id)])
         return resp
 
 
+class EquipmentBooking(Booking):
+    _api = 'equipment'
+
+
+class EquipmentLocation(dict):
+    @property
+    def categories(self):
+        ret = []
+        for result in self['parent'].equipment.categories(ids=self.id):
+            if result['lid'] == self.id:
+                for cat in result['categories']:
+                    ret.append(self['parent'].index.add(EquipmentCategory(
+                        parent=self['parent'],
+                        location_name=self['name'],
+                        **cat
+                    ), parent=self))
+        return ret
+
+    @property
+    def items(self):
+        '''
+        Every item in every category of this location. The categories are fetched concurrently.
+        '''
+        lc = self['parent']
+        futures = [lc._fork(lambda cat: cat.items, cat) for cat in self.categories]
+        return [item for future in futures for item in future.result()]
+
+    @property
+    def id(self):
+        return self['lid']
+
+    def __str__(self):
+        return '<{}: name={}, id={}>'.format(type(self).__name__, self['name'], self.id)
+
+    def __repr__(self):
+        return str(self)
+
+
+class EquipmentCategory(dict):
+    @property
+    def items(self):
+        ret = []
+        for result in self['parent'].equipment.category(cid=self.id):
+            for item in result.get('items', []):
+                ret.append(self['parent'].index.add(EquipmentItem(
+                    parent=self['parent'],
+                    cid=self.id,
+                    location_name=self['location_name'],
+                    **{k: v for k, v in item.items() if k != 'cid'}
+                ), parent=self))
+        return ret
+
+    @property
+    def id(self):
+        return self['cid']
+
+    def __str__(self):
+        return '<{}: name={}, id={}, location_name={}>'.format(
+            type(self).__name__,
+            self['name'],
+            self.id,
+            self['location_name'],
+        )
+
+    def __repr__(self):
+        return str(self)
+
+
+class EquipmentItem(dict):
+    def is_available_at(self, dt=None):
+        dt = dt or datetime.datetime.now().astimezone()
+        if dt.tzname() is None:
+            dt = dt.astimezone()
+
+        return _availability_index(self).contains(dt)
+
+    def is_available_between(self, startDT, endDT):
+        '''
+        :return: True if back-to-back availability slots cover all of startDT to endDT
+        '''
+        return _availability_index(self).covers(startDT, endDT)
+
+    @property
+    def id(self):
+        return self['id']
+
+    def reserve(self, fname, lname, email, startDT=None, endDT=None, ):
+        '''
+        The start/end time has be match one of the availability slots.
+        :param startDT: datetime
+        :param endDT: endtime
+        :param fname:
+        :param lname:
+        :param email:
+        :return:
+        '''
+        startDT = startDT or datetime.datetime.now().astimezone()
+        if startDT.tzname() is None:
+            startDT = startDT.astimezone()
+
+        index = _availability_index(self)
+        slot = index.slot_at(startDT)
+        assert slot, 'This item is not available at startDT={}'.format(startDT)
+        startDT = slot[0]
+
+        endDT = endDT or startDT
+        if endDT.tzname() is None:
+            endDT = endDT.astimezone()
+        slot = index.slot_ending(endDT) if endDT > startDT else index.slot_at(startDT)
+        assert slot, 'This item is not available at endDT={}'.format(endDT)
+        endDT = slot[1]
+
+        resp = self['parent'].equipment.reserve(
+            start=startDT,
+            fname=fname,
+            lname=lname,
+            email=email,
+            bookings=[{
+                'id': self.id,
+                'to': endDT.isoformat(),
+            }],
+        )
+
+        return self['parent'].index.add(EquipmentBooking(
+            parent=self['parent'],
+            **resp,
+        ), parent=self)
+
+    @property
+    def bookings(self):
+        ret = []
+        for booking in self['parent'].equipment.bookings(
+                eid=self.id,
+        ):
+            ret.append(self['parent'].index.add(EquipmentBooking(
+                parent=self['parent'],
+                **booking,
+            ), parent=self))
+        return ret
+
+    def __str__(self):
+        return '<{}: name={}, id={}, isAvailableNow={}, location_name={}>'.format(
+            type(self).__name__,
+            self.get('name', None),
+            self.id,
+            self.is_available_at(),
+            self.get('location_name', None),
+        )
+
+    def __repr__(self):
+        return str(self)
+
+
+class Appointment(dict):
+
+    @property
+    def id(self):
+        return self.get('bookId', self.get('id', None))
+
+    @property
+    def start(self):
+        return datetime.datetime.fromisoformat(self['fromDate']) if self.get('fromDate', None) else None
+
+    @property
+    def end(self):
+        return datetime.datetime.fromisoformat(self['toDate']) if self.get('toDate', None) else None
+
+    def __str__(self):
+        return '<{}: id={}, start={}, end={}, user_id={}>'.format(
+            type(self).__name__,
+            self.id,
+            self.start,
+            self.end,
+            self.get('userId', self.get('user_id', None)),
+        )
+
+    def __repr__(self):
+        return str(self)
+
+
 class LibCal:
+    HEDGE_ENDPOINTS = (
+        ('spaces', 'seats'),
+        ('spaces', 'seat'),
+        ('spaces', 'item'),
+        ('spaces', 'category'),
+        ('spaces', 'categories'),
+        ('hours', 'hours'),
+    )
+
     def __init__(
             self,
             baseURL,
@@ -840,12 +2582,80 @@ class LibCal:
             clientSecret,
             apiURL='https://api2.libcal.com/',
             debug=False,
+            codec=None,
+            transport=None,
+            executor=None,
+            throttle=None,
+            cache=None,
+            cacheTTL=0,
+            cacheNamespace=None,
+            timeout=30,
+            hedge=False,
+            hedgePercentile=95,
+            resilience=False,
+            staleGrace=0,
+            breakerThreshold=5,
+            breakerResetTimeout=30,
+            maxConnections=32,
+            accessLog=False,
     ):
+        '''
+        A LibCal instance is safe to share between threads.
+
+        :param codec: str like 'orjson', 'ujson' or 'json', or an object with a loads() method.
+            None means use the fastest JSON library installed.
+        :param transport: object with a request(method, url, **kwargs) method, like a requests.Session.
+            Defaults to a new requests.Session so connections are reused.
+        :param executor: concurrent.futures.Executor used for concurrent work. Defaults to a ThreadPoolExecutor.
+        :param throttle: function called (and allowed to block) before every API request
+        :param cache: _ResponseCache for GET responses. One is created if cacheTTL is set.
+        :param cacheTTL: float, seconds a GET response is served from the cache. 0 disables caching.
+        :param cacheNamespace: str, partition of the cache used by this client. Defaults to baseURL.
+        :param timeout: float, seconds before a single request times out. See also deadline().
+        :param hedge: bool, or a list of (api name, attribute name) pairs like [('spaces', 'seats'), ('hours', 'hours')].
+            A bare attribute name like 'item' hedges that endpoint in every api.
+            If set, a duplicate of a slow request is sent and the first response wins.
+            True hedges the idempotent spaces and hours GETs in HEDGE_ENDPOINTS.
+        :param hedgePercentile: float, latency percentile (per endpoint) after which a duplicate is sent
+        :param resilience: bool, enable the circuit breakers and serving stale GET responses.
+            A response cache is created if there is none. Stale responses are StaleList/StaleDict with .stale and .age
+        :param staleGrace: float, seconds after cacheTTL during which a stale response is returned at once
+            while it is refreshed in the background
+        :param breakerThreshold: int, consecutive failures that open an endpoint family's circuit breaker
+        :param breakerResetTimeout: float, seconds before an open circuit breaker lets a trial request through
+        :param maxConnections: int, HTTP connections kept open per host by the default transport
+        :param accessLog: bool, count the GET calls made by the application (needed by CacheWarmer).
+            See track_access().
+        '''
         self.baseURL = baseURL
         self.clientID = clientID
         self.clientSecret = clientSecret
         self.apiURL = apiURL
         self.debug = debug
+        self.codec = codec if hasattr(codec, 'loads') else _JSONCodec(codec)
+        self.transport = transport or _new_session(maxConnections)
+        self.executor = executor or concurrent.futures.ThreadPoolExecutor(max_workers=8)
+        self.throttle = throttle
+        self.cache = cache if cache is not None or not (cacheTTL or resilience) else _ResponseCache()
+        self.cacheTTL = cacheTTL
+        self.cacheNamespace = cacheNamespace or baseURL
+        self.timeout = timeout
+        self.hedger = None
+        if hedge:
+            self.hedger = _Hedger(
+                endpoints=self.HEDGE_ENDPOINTS if hedge is True else hedge,
+                percentile=hedgePercentile,
+            )
+        self.resilience = None
+        if resilience:
+            self.resilience = _Resilience(
+                executor=self.executor,
+                staleGrace=staleGrace,
+                failureThreshold=breakerThreshold,
+                resetTimeout=breakerResetTimeout,
+            )
+        self.index = _Index()
+        self.accessLog = _AccessLog() if accessLog else None
 
         #
         self.tokenManager = _TokenManager(
@@ -853,6 +2663,9 @@ class LibCal:
             clientSecret=self.clientSecret,
             apiURL=self.apiURL,
             debug=self.debug,
+            codec=self.codec,
+            transport=self.transport,
+            timeout=self.timeout,
         )
 
         for cls in [
@@ -870,14 +2683,38 @@ class LibCal:
         if self.debug:
             print(*a, **k)
 
+    def track_access(self):
+        '''
+        Start counting GET calls, if not already.
+        :return: _AccessLog
+        '''
+        if self.accessLog is None:
+            self.accessLog = _AccessLog()
+            for api in vars(self).values():
+                if isinstance(api, _BaseAPI):
+                    api.accessLog = self.accessLog
+        return self.accessLog
+
     def _add_api(self, cls):
+        name = cls.__name__.strip('_').lower()
         setattr(
             self,
-            cls.__name__.strip('_').lower(),
+            name,
             cls(
                 baseURL=self.baseURL,
                 tokenCallback=self.tokenManager.GetAccessToken,
-                debug=self.debug
+                debug=self.debug,
+                codec=self.codec,
+                transport=self.transport,
+                throttle=self.throttle,
+                cache=self.cache,
+                cacheTTL=self.cacheTTL,
+                cacheNamespace=self.cacheNamespace,
+                timeout=self.timeout,
+                hedger=self.hedger,
+                resilience=self.resilience,
+                name=name,
+                accessLog=self.accessLog,
             )
         )
 
@@ -886,34 +2723,1268 @@ class LibCal:
         ret = []
         locations = self.spaces.locations()
         for loc in locations:
-            ret.append(Location(parent=self, **loc))
+            ret.append(self.index.add(Location(parent=self, **loc)))
+        return ret
+
+    def submit(self, fn, *a, **k):
+        '''
+        Run fn(*a, **k) on this client's executor. The current deadline() applies inside fn.
+        :return: concurrent.futures.Future
+        '''
+        return self.executor.submit(contextvars.copy_context().run, fn, *a, **k)
+
+    def _fork(self, fn, *a, **k):
+        '''
+        Like submit(), for fan-out work whose result is waited on. Safe to call from inside submitted work.
+        :return: _InlineFuture
+        '''
+        return _InlineFuture(self.executor, fn, *a, **k)
+
+    def _walk(self, kind):
+        '''
+        Traverse the Location > Category > Space > Seat tree only as deep as needed to yield
+            every object of this kind. Everything visited is added to the index.
+        '''
+        for location in self.locations:
+            if kind == 'location':
+                yield location
+            elif kind == 'category':
+                yield from location.categories
+            elif kind == 'zone':
+                yield from location.zones
+            else:
+                for space in location.spaces:
+                    if kind == 'space':
+                        yield space
+                    else:
+                        yield from space.seats
+
+    def _lookup(self, kind, ID):
+        obj = self.index.get(kind, ID)
+        if obj is None:
+            if kind == 'booking':
+                self.find(booking_ids=ID)
+            else:
+                for obj in self._walk(kind):
+                    if str(obj.id) == str(ID):
+                        break
+        return self.index.get(kind, ID)
+
+    def location(self, lid):
+        return self._lookup('location', lid)
+
+    def category(self, cid):
+        return self._lookup('category', cid)
+
+    def space(self, space_id):
+        return self._lookup('space', space_id)
+
+    def seat(self, seat_id):
+        '''
+        Constant-time once the seat has been seen by any traversal.
+        Otherwise the tree is walked until the seat is found.
+        :param seat_id: int or str
+        :return: Seat or None
+        '''
+        return self._lookup('seat', seat_id)
+
+    def zone(self, zone_id):
+        return self._lookup('zone', zone_id)
+
+    def booking(self, booking_id):
+        return self._lookup('booking', booking_id)
+
+    def pages(self, method, pageKey='page', sizeKey='limit', pageSize=100, firstPage=1, **params):
+        '''
+        Yield every item from a paged endpoint, one page at a time, stopping at the first short page.
+        Like lc.pages(lc.spaces.bookings, lid=123, date=datetime.date.today(), days=7)
+
+        :param method: endpoint method, like lc.spaces.bookings
+        :param pageKey: str, name of the page number parameter
+        :param sizeKey: str, name of the page size parameter
+        :param pageSize: int
+        :param firstPage: int, number of the first page (0 or 1 depending on the endpoint)
+        :param params: passed to method
+        :return: generator
+        '''
+        page = firstPage
+        while True:
+            with _untracked():
+                items = method(**{pageKey: page, sizeKey: pageSize}, **params)
+            yield from items
+            if len(items) < pageSize:
+                return
+            page += 1
+
+    def iter_bookings(self, since, until=None, lid=None, cid=None, eid=None, email=None, workers=8, raw=False, **params):
+        '''
+        Retrieve bookings over a date range in parallel, yielding them in start-time order.
+
+        The query is split into one shard per day and per location (or per value of whichever of
+            lid/cid/eid/email is given as a list). Up to workers shards are paged through at once on
+            this client's executor, and the shards of each day are merged by start time as soon as
+            they are done, so results stream out while later days are still being fetched.
+            A shard no worker has picked up yet is run by the waiting thread, so this can be called
+            from inside lc.submit() or LibCalPool.submit() work.
+        Bookings returned by more than one shard are yielded once (by bookId).
+
+        Example:
+            for booking in lc.iter_bookings(datetime.date(2024, 1, 8), datetime.date(2024, 5, 3)):
+                print(booking)
+
+        :param since: datetime.date, first day
+        :param until: datetime.date, last day (inclusive), defaults to since
+        :param lid: location ID or list of IDs. If nothing is given, every location is queried.
+        :param cid: category ID or list of IDs
+        :param eid: space ID or list of IDs
+        :param email: str or list of str
+        :param workers: int, shards fetched at the same time
+        :param raw: bool, yield the response dicts instead of Booking objects.
+            Bookings from a range pull are not added to lc.index, which never evicts, so a long running
+            process does not grow with every semester it pulls.
+        :param params: passed to spaces.bookings, like formAnswers=True
+        :return: generator
+        '''
+        until = until or since
+        filters = dict(params)
+        shardKey, shardValues = None, [None]
+        for key, value in (('lid', lid), ('cid', cid), ('eid', eid), ('email', email)):
+            if isinstance(value, (list, tuple, set)):
+                if shardKey is not None:
+                    raise ValueError('Only one of lid/cid/eid/email can be a list')
+                shardKey, shardValues = key, list(value)
+            elif value is not None:
+                filters[key] = value
+
+        if shardKey is None and not any(key in filters for key in ('lid', 'cid', 'eid', 'email')):
+            with _untracked():
+                shardKey, shardValues = 'lid', [loc['lid'] for loc in self.spaces.locations()]
+
+        shards = []
+        for offset in range((until - since).days + 1):
+            for value in shardValues:
+                shards.append((since + datetime.timedelta(days=offset), value))
+
+        def start(booking):
+            return datetime.datetime.fromisoformat(booking['fromDate'])
+
+        def fetch(day, value):
+            shardParams = dict(filters, date=day, days=1)
+            if shardKey is not None:
+                shardParams[shardKey] = value
+            rows = list(self.pages(self.spaces.bookings, pageKey='page', sizeKey='limit', pageSize=500, firstPage=1,
+                                   **shardParams))
+            rows.sort(key=start)
+            return rows
+
+        shardIter = iter(shards)
+        futures = deque()  # (day, future) in shard order
+
+        def top_up():
+            while len(futures) < workers:
+                shard = next(shardIter, None)
+                if shard is None:
+                    return
+                futures.append((shard[0], self._fork(fetch, *shard)))
+
+        seen = set()
+        try:
+            top_up()
+            while futures:
+                day = futures[0][0]
+                dayResults = []
+                while futures and futures[0][0] == day:
+                    dayResults.append(futures.popleft()[1].result())
+                    top_up()
+
+                for booking in heapq.merge(*dayResults, key=start):
+                    ID = booking.get('bookId', None)
+                    if ID is not None:
+                        if ID in seen:
+                            continue
+                        seen.add(ID)
+                    yield booking if raw else Booking(parent=self, **booking)
+        finally:
+            for day, future in futures:
+                future.cancel()
+
+    def _batched(self, method, ids, batchSize=50, **params):
+        '''
+        Look up many IDs with as few requests as possible: the IDs are sent batchSize at a time
+            as a comma separated list, and the batches run concurrently.
+        :param method: endpoint method that takes ids=, like lc.equipment.item
+        :return: list of the results of every batch
+        '''
+        ids = list(ids)
+        with _untracked():  # the batches run in copies of this context
+            futures = [
+                self._fork(method, ids=ids[i:i + batchSize], **params)
+                for i in range(0, len(ids), batchSize)
+            ]
+        return [result for future in futures for result in future.result()]
+
+    @property
+    def equipment_locations(self):
+        ret = []
+        for loc in self.equipment.locations():
+            ret.append(self.index.add(EquipmentLocation(parent=self, **loc)))
+        return ret
+
+    def equipment_items(self, lids=None):
+        '''
+        Every equipment item, traversing locations and their categories concurrently.
+        :param lids: list of equipment location IDs, defaults to all
+        :return: list of EquipmentItem
+        '''
+        locations = [loc for loc in self.equipment_locations if lids is None or loc.id in lids]
+        futures = [self._fork(lambda loc: loc.categories, loc) for loc in locations]
+        categories = [cat for future in futures for cat in future.result()]
+        futures = [self._fork(lambda cat: cat.items, cat) for cat in categories]
+        return [item for future in futures for item in future.result()]
+
+    def equipment_availability(self, item_ids, date=None, batchSize=50):
+        '''
+        Availability for many equipment items with one request per batchSize items, run concurrently.
+        Items already in the index are updated in place, so their is_available_at() reflects the new data.
+        :param item_ids: list of item IDs
+        :param date: datetime.date, defaults to today
+        :return: dict like {item_id: EquipmentItem}
+        '''
+        ret = {}
+        params = {'availability': date} if date else {}
+        for result in self._batched(self.equipment.item, item_ids, batchSize, **params):
+            item = self.index.get('equipmentitem', result['id'])
+            if item is None:
+                item = self.index.add(EquipmentItem(parent=self, **result))
+            else:
+                item.update(result)
+            ret[item.id] = item
         return ret
 
+    def equipment_item(self, item_id):
+        '''
+        Constant-time once the item has been seen, otherwise one equipment.item request.
+        '''
+        item = self.index.get('equipmentitem', item_id)
+        if item is None:
+            self.equipment_availability([item_id])
+            item = self.index.get('equipmentitem', item_id)
+        return item
+
+    def find_appointments(self, ids, batchSize=50):
+        '''
+        :param ids: appointment booking IDs
+        :return: list of Appointment
+        '''
+        if isinstance(ids, (int, str)):
+            ids = [ids]
+        return [
+            self.index.add(Appointment(parent=self, **result))
+            for result in self._batched(self.appointments.booking, ids, batchSize)
+        ]
+
+    def iter_appointments(self, since, until=None, workers=8, **params):
+        '''
+        Appointment bookings over a date range, one request per day run concurrently, in start-time order.
+        :param since: datetime.date
+        :param until: datetime.date (inclusive), defaults to since
+        :param params: passed to appointments.bookings, like user_id=123
+        :return: generator of Appointment, not added to the index (use find_appointments for that)
+        '''
+        until = until or since
+        days = [since + datetime.timedelta(days=i) for i in range((until - since).days + 1)]
+
+        def fetch(day):
+            rows = list(self.pages(self.appointments.bookings, date=day, days=1, **params))
+            rows.sort(key=lambda row: row.get('fromDate', ''))
+            return rows
+
+        futures = deque()
+        try:
+            for day in days:
+                futures.append(self._fork(fetch, day))
+                if len(futures) >= workers:
+                    for row in futures.popleft().result():
+                        yield Appointment(parent=self, **row)
+            while futures:
+                for row in futures.popleft().result():
+                    yield Appointment(parent=self, **row)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _refresh_seats(self, seats):
+        '''
+        Update the availability of these seats in place with one spaces.seats query per space, run concurrently.
+        '''
+        bySpace = defaultdict(dict)
+        for seat in seats:
+            space = self.index.parent(seat)
+            if space is not None:
+                bySpace[space.id, space['lid']][str(seat.id)] = seat
+
+        def fetch(spaceID, lid):
+            return list(self.pages(self.spaces.seats, pageKey='pageIndex', sizeKey='pageSize', pageSize=100,
+                                   firstPage=0, location_id=lid, spaceId=spaceID))
+
+        futures = [(seatsByID, self._fork(fetch, *key)) for key, seatsByID in bySpace.items()]
+        for seatsByID, future in futures:
+            for result in future.result():
+                seat = seatsByID.get(str(result['id']), None)
+                if seat is not None:
+                    seat['availability'] = result['availability']
+
     def find(self, booking_ids=None, seat_ids=None):
         if booking_ids:
             resp = self.spaces.booking(ids=booking_ids)
             ret = []
             for item in resp:
-                ret.append(Booking(
+                ret.append(self.index.add(Booking(
                     parent=self,
                     **item
-                ))
+                )))
             return ret
 
         elif seat_ids:
-            ret = []
             if isinstance(seat_ids, (int, str)):
                 seat_ids = [seat_ids]
 
-            for location in self.locations:
-                for space in location.spaces:
-                    for seat in space.seats:
-                        if seat.id in seat_ids:
-                            ret.append(seat)
+            cached = [seat for seat in (self.index.get('seat', ID) for ID in seat_ids) if seat is not None]
+            missing = {str(ID) for ID in seat_ids if self.index.get('seat', ID) is None}
+            if missing:
+                for seat in self._walk('seat'):
+                    missing.discard(str(seat.id))
+                    if not missing:
+                        break
+
+            # seats that were already indexed may hold old availability, refresh them one space at a time
+            self._refresh_seats(cached)
+
+            ret = []
+            for ID in seat_ids:
+                seat = self.index.get('seat', ID)
+                if seat is not None:
+                    ret.append(seat)
             return ret
 
 
+class LibCalPool:
+    '''
+    Runs many LibCal tenants in one process.
+
+    All tenants share one HTTP connection pool, one worker pool and one response cache.
+    Each tenant keeps its own token manager and its own cache namespace, and can be given
+        a request rate quota and a limit on how many of its tasks run at once.
+    Workers take tasks round-robin across tenants, so one tenant's bulk export cannot
+        starve another tenant's interactive requests.
+
+    Example:
+        pool = LibCalPool(maxWorkers=16)
+        pool.add('main', baseURL=..., clientID=..., clientSecret=..., requestsPerSecond=5)
+        pool.add('law', baseURL=..., clientID=..., clientSecret=..., maxConcurrent=2)
+        future = pool.submit('law', lambda lc: lc.locations)
+    '''
+
+    def __init__(self, maxWorkers=16, maxConnections=32, cacheSize=10000, transport=None):
+        '''
+        :param maxWorkers: int, threads shared by all tenants
+        :param maxConnections: int, HTTP connections kept open per host
+        :param cacheSize: int, total entries in the shared response cache
+        :param transport: shared transport. Defaults to a requests.Session sized for maxConnections.
+        '''
+        self.transport = transport or _new_session(maxConnections)
+        self.maxConnections = maxConnections
+        self.executor = _FairExecutor(maxWorkers=maxWorkers)
+        self.cache = _ResponseCache(maxsize=cacheSize)
+        self._tenants = OrderedDict()
+
+    def add(
+            self,
+            name,
+            baseURL,
+            clientID,
+            clientSecret,
+            requestsPerSecond=None,
+            burst=None,
+            maxConcurrent=None,
+            cacheTTL=0,
+            **kwargs
+    ):
+        '''
+        :param name: str, unique tenant name. Also used as the tenant's cache namespace.
+        :param requestsPerSecond: float, this tenant's request quota. None means unlimited.
+        :param burst: int, requests allowed back to back before the quota applies
+        :param maxConcurrent: int, this tenant's share of the worker pool. None means unlimited.
+        :param cacheTTL: float, seconds GET responses are cached for this tenant
+        :param kwargs: passed to LibCal
+        :return: LibCal
+        '''
+        if name in self._tenants:
+            raise ValueError('Tenant "{}" already exists'.format(name))
+
+        self.executor.set_limit(name, maxConcurrent)
+        lc = LibCal(
+            baseURL=baseURL,
+            clientID=clientID,
+            clientSecret=clientSecret,
+            transport=self.transport,
+            executor=_TenantExecutor(self.executor, name),
+            throttle=_TokenBucket(requestsPerSecond, burst) if requestsPerSecond else None,
+            cache=self.cache,
+            cacheTTL=cacheTTL,
+            cacheNamespace=name,
+            **kwargs
+        )
+        self._tenants[name] = lc
+
+        # one connection pool per tenant host plus the token host(s), so none is evicted
+        hosts = set()
+        for tenant in self._tenants.values():
+            hosts.update(urllib.parse.urlsplit(url).netloc for url in (tenant.baseURL, tenant.apiURL))
+        _fit_host_pools(self.transport, len(hosts), self.maxConnections)
+        return lc
+
+    def remove(self, name):
+        self._tenants.pop(name)
+        self.cache.clear(name)
+
+    def get(self, name):
+        return self._tenants[name]
+
+    __getitem__ = get
+
+    def __contains__(self, name):
+        return name in self._tenants
+
+    def __iter__(self):
+        return iter(self._tenants)
+
+    def submit(self, name, fn, *a, **k):
+        '''
+        Run fn(lc, *a, **k) on the shared worker pool, where lc is the tenant's LibCal.
+        :return: concurrent.futures.Future
+        '''
+        return self.executor.submit(name, fn, self._tenants[name], *a, **k)
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait)
+        if hasattr(self.transport, 'close'):
+            self.transport.close()
+
+
+class AvailabilityPoller:
+    '''
+    Keeps the availability of a set of spaces fresh without polling everything on a fixed loop.
+
+    Busy spaces (availability changed recently, close to opening time, or watched by subscribers)
+        are polled every minInterval seconds. Each poll that finds no change doubles the interval,
+        up to maxInterval. The intervals are stretched as needed so the total request rate stays
+        under maxRequestsPerMinute.
+
+    Each poll is diffed against the previous one, and only the slots that were added or removed
+        are pushed to subscribers as a dict like:
+        {'space_id': 123, 'seat_id': 456, 'added': [{'from':..., 'to':...}], 'removed': [...]}
+        seat_id is None for spaces that are booked as a whole.
+
+    Example:
+        poller = AvailabilityPoller(lc, maxRequestsPerMinute=30)
+        poller.subscribe(lc.space(123), callback=print)
+        poller.start()
+    '''
+
+    def __init__(
+            self,
+            libcal,
+            minInterval=10,
+            maxInterval=300,
+            subscribedInterval=30,
+            maxRequestsPerMinute=60,
+            openingWindow=datetime.timedelta(minutes=30),
+    ):
+        '''
+        :param libcal: LibCal
+        :param minInterval: float, seconds between polls of a busy space
+        :param maxInterval: float, seconds between polls of an idle space
+        :param subscribedInterval: float, longest interval for a space that has subscribers
+        :param maxRequestsPerMinute: int, request budget for the whole poller
+        :param openingWindow: timedelta, how close to the first slot of the day a space counts as busy
+        '''
+        self.libcal = libcal
+        self.minInterval = minInterval
+        self.maxInterval = maxInterval
+        self.subscribedInterval = subscribedInterval
+        self.maxRequestsPerMinute = maxRequestsPerMinute
+        self.openingWindow = openingWindow
+
+        self._lock = threading.RLock()
+        self._spaces = {}  # space_id -> Space
+        self._state = {}  # space_id -> dict with interval, dueAt, openAt, openDate, slots
+        self._subscribers = defaultdict(list)  # space_id -> [(token, deliver), ...]
+        self._nextToken = 0
+        self._nextStartAt = 0  # time.monotonic() when the next newly watched space may be polled
+        self._stopEvent = threading.Event()
+        self._wakeEvent = threading.Event()
+        self._thread = None
+
+    def watch(self, space):
+        '''
+        Poll this space even if nothing is subscribed to it.
+        :param space: Space
+        '''
+        with self._lock:
+            if space.id not in self._spaces:
+                # first polls are spread out at the budgeted rate instead of all at once
+                self._nextStartAt = max(time.monotonic(), self._nextStartAt + 60 / self.maxRequestsPerMinute)
+                self._spaces[space.id] = space
+                self._state[space.id] = {
+                    'interval': self.minInterval,
+                    'dueAt': self._nextStartAt,
+                    'openAt': None,
+                    'openDate': None,
+                    'slots': None,
+                }
+        self._wakeEvent.set()
+
+    def unwatch(self, space):
+        with self._lock:
+            self._spaces.pop(space.id, None)
+            self._state.pop(space.id, None)
+            self._subscribers.pop(space.id, None)
+
+    def subscribe(self, space, callback=None, queue=None, loop=None):
+        '''
+        Receive availability deltas for a space.
+        The current availability (if already polled) is delivered right away as one 'added' delta.
+
+        :param space: Space
+        :param callback: function(delta), called from the poller thread
+        :param queue: queue.Queue, or asyncio.Queue together with loop
+        :param loop: asyncio event loop that owns queue. Defaults to the running loop for an asyncio.Queue.
+        :return: int token for unsubscribe()
+        '''
+        if callback is None and queue is None:
+            raise ValueError('subscribe() needs a callback or a queue')
+
+        if queue is not None:
+            if loop is None and isinstance(queue, asyncio.Queue):
+                loop = asyncio.get_running_loop()
+
+            if loop is not None:
+                def deliver(delta):
+                    loop.call_soon_threadsafe(queue.put_nowait, delta)
+            else:
+                deliver = queue.put_nowait
+        else:
+            deliver = callback
+
+        self.watch(space)
+        with self._lock:
+            self._nextToken += 1
+            token = self._nextToken
+            self._subscribers[space.id].append((token, deliver))
+            slots = self._state[space.id]['slots']
+
+        if slots:
+            for seatID, current in slots.items():
+                deliver(self._delta(space.id, seatID, current, []))
+
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            for spaceID, subscribers in self._subscribers.items():
+                subscribers[:] = [s for s in subscribers if s[0] != token]
+
+    @staticmethod
+    def _delta(spaceID, seatID, added, removed):
+        return {
+            'space_id': spaceID,
+            'seat_id': seatID,
+            'added': [{'from': from_, 'to': to} for from_, to in sorted(added)],
+            'removed': [{'from': from_, 'to': to} for from_, to in sorted(removed)],
+        }
+
+    def _fetch(self, space):
+        '''
+        :return: dict like {seat_id or None: [availability, ...]}
+        '''
+        with _untracked():
+            return self._fetch_untracked(space)
+
+    def _fetch_untracked(self, space):
+        if space.get('isBookableAsWhole', None) is True:
+            results = self.libcal.spaces.item(ids=space.id)
+            for result in results:
+                if str(result.get('id', space.id)) == str(space.id):
+                    space['availability'] = result['availability']
+            return {None: space.get('availability', [])}
+
+        ret = {}
+        for seat in self.libcal.pages(self.libcal.spaces.seats, pageKey='pageIndex', sizeKey='pageSize',
+                                      pageSize=100, firstPage=0, location_id=space['lid'], spaceId=space.id):
+            ret[seat['id']] = seat['availability']
+            indexed = self.libcal.index.get('seat', seat['id'])
+            if indexed is not None:
+                indexed['availability'] = seat['availability']
+        return ret
+
+    def poll(self, space):
+        '''
+        Poll one space now, push any changes to its subscribers and reschedule it.
+        :param space: Space
+        :return: list of deltas
+        '''
+        self.watch(space)
+        availability = self._fetch(space)
+
+        current = {
+            seatID: {(fromTo['from'], fromTo['to']) for fromTo in slots}
+            for seatID, slots in availability.items()
+        }
+        starts = [from_ for slots in current.values() for from_, to in slots]
+
+        with self._lock:
+            state = self._state.get(space.id, None)
+            if state is None:  # unwatched while polling
+                return []
+
+            previous = state['slots'] or {}
+            state['slots'] = current
+            # opening time is the first slot of the day, recorded by the first poll of each date; if that
+            #     slot has already started the space is open and the earliest free slot is only the
+            #     next free one, which would keep the space busy all day
+            if starts and state['openDate'] != datetime.date.today():
+                first = datetime.datetime.fromisoformat(min(starts))
+                state['openAt'] = first if first > datetime.datetime.now(first.tzinfo) else None
+                state['openDate'] = datetime.date.today()
+
+            deltas = []
+            for seatID in current.keys() | previous.keys():
+                added = current.get(seatID, set()) - previous.get(seatID, set())
+                removed = previous.get(seatID, set()) - current.get(seatID, set())
+                if added or removed:
+                    deltas.append(self._delta(space.id, seatID, added, removed))
+
+            if deltas:
+                state['interval'] = self.minInterval
+            else:
+                state['interval'] = min(state['interval'] * 2, self.maxInterval)
+
+            state['dueAt'] = time.monotonic() + self._interval(space.id)
+            subscribers = [deliver for token, deliver in self._subscribers.get(space.id, [])]
+
+        for delta in deltas:
+            for deliver in subscribers:
+                try:
+                    deliver(delta)
+                except Exception as e:
+                    self.libcal.print('AvailabilityPoller subscriber error', e)
+
+        return deltas
+
+    def _effective_interval(self, spaceID):
+        '''
+        Seconds between polls of this space before the request budget is applied.
+        Call with self._lock held.
+        '''
+        state = self._state[spaceID]
+        interval = state['interval']
+
+        if self._subscribers.get(spaceID, None):
+            interval = min(interval, self.subscribedInterval)
+
+        if state['openAt'] is not None:
+            now = datetime.datetime.now(state['openAt'].tzinfo)
+            if abs(now - state['openAt']) <= self.openingWindow:
+                interval = self.minInterval
+
+        return max(interval, self.minInterval)
+
+    def _interval(self, spaceID):
+        '''
+        Seconds until the next poll of this space, including the request budget.
+        Every space's effective interval is stretched by the same factor if their total rate is over budget.
+        Call with self._lock held.
+        '''
+        intervals = {ID: self._effective_interval(ID) for ID in self._state}
+        rate = sum(1 / interval for interval in intervals.values())
+        budget = self.maxRequestsPerMinute / 60
+        factor = max(1, rate / budget)
+        for ID, interval in intervals.items():
+            self._state[ID]['effectiveInterval'] = interval * factor
+
+        return self._state[spaceID]['effectiveInterval']
+
+    def run_pending(self):
+        '''
+        Poll every space that is due. Useful for callers that run their own loop.
+        :return: float, seconds until the next space is due
+        '''
+        with self._lock:
+            now = time.monotonic()
+            due = [self._spaces[ID] for ID, state in self._state.items() if state['dueAt'] <= now]
+
+        for space in due:
+            if self._stopEvent.is_set():
+                break
+            try:
+                self.poll(space)
+            except Exception as e:
+                self.libcal.print('AvailabilityPoller poll error', space, e)
+                with self._lock:
+                    if space.id in self._state:
+                        self._state[space.id]['dueAt'] = time.monotonic() + self.maxInterval
+
+        with self._lock:
+            if not self._state:
+                return self.maxInterval
+            return max(0, min(state['dueAt'] for state in self._state.values()) - time.monotonic())
+
+    def _run(self):
+        while not self._stopEvent.is_set():
+            wait = self.run_pending()
+            self._wakeEvent.wait(wait)
+            self._wakeEvent.clear()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopEvent.clear()
+            self._thread = threading.Thread(target=self._run, name='AvailabilityPoller', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopEvent.set()
+        self._wakeEvent.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class CacheWarmer:
+    '''
+    Prefetches tomorrow's busiest requests into the response cache just before a daily peak.
+
+    Every GET the application makes is counted (see LibCal.track_access()). Ahead of each peak window,
+        the most frequent requests are sent again with their date arguments (like availability,
+        date, from/to) set to the day of the peak, and cached until the peak window ends.
+        Catalog requests without date arguments, like spaces.locations, are refreshed the same way.
+    The requests are spread evenly over the lead time and limited to maxRequestsPerMinute,
+        dropping the least used ones if they don't all fit, so warming does not trigger throttling.
+
+    The client must have a response cache (cacheTTL or cache).
+
+    Example:
+        lc = LibCal(..., cacheTTL=60)
+        warmer = CacheWarmer(lc, peakWindows=[('07:55', '08:05')], lead=datetime.timedelta(minutes=10))
+        warmer.start()
+    '''
+
+    def __init__(
+            self,
+            libcal,
+            peakWindows=(('07:55', '08:05'),),
+            lead=datetime.timedelta(minutes=10),
+            maxRequestsPerMinute=60,
+            decay=0.5,
+    ):
+        '''
+        :param libcal: LibCal
+        :param peakWindows: list of (start, end) local times, as 'HH:MM' strings or datetime.time
+        :param lead: timedelta, how long before each peak to start warming
+        :param maxRequestsPerMinute: int, request budget while warming
+        :param decay: float, access counts are multiplied by this after each warm-up so old habits fade
+        '''
+        if libcal.cache is None:
+            raise ValueError('CacheWarmer needs a LibCal with a response cache, set cacheTTL')
+
+        libcal.track_access()
+        self.libcal = libcal
+        self.peakWindows = [
+            tuple(t if isinstance(t, datetime.time) else datetime.time.fromisoformat(t) for t in window)
+            for window in peakWindows
+        ]
+        self.lead = lead
+        self.maxRequestsPerMinute = maxRequestsPerMinute
+        self.decay = decay
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    def next_peak(self, now=None):
+        '''
+        :return: (start, end) datetimes of the next peak window whose warm-up has not started yet
+        '''
+        now = now or datetime.datetime.now()
+        peaks = []
+        for offset in (0, 1):
+            day = now.date() + datetime.timedelta(days=offset)
+            for start, end in self.peakWindows:
+                startDT = datetime.datetime.combine(day, start)
+                endDT = datetime.datetime.combine(day, end)
+                if endDT <= startDT:
+                    endDT += datetime.timedelta(days=1)
+                if startDT - self.lead >= now:
+                    peaks.append((startDT, endDT))
+        return min(peaks)
+
+    def plan(self, peakStart, peakEnd, now=None):
+        '''
+        :return: list of (apiName, attribute_name, kwargs) to fetch, most used first, that fit the budget
+        '''
+        now = now or datetime.datetime.now()
+        seconds = max(0, (peakStart - now).total_seconds())
+        budget = int(seconds * self.maxRequestsPerMinute / 60)
+
+        ret = []
+        for count, apiName, attribute_name, kwargs in self.libcal.accessLog.top(budget):
+            api = getattr(self.libcal, apiName)
+            kwargs = dict(kwargs)
+            for param in api.dateParams.get(attribute_name, ()):
+                if param not in kwargs:  # it was today, explicit other dates are kept
+                    kwargs[param] = peakStart.date()
+            ret.append((apiName, attribute_name, kwargs))
+        return ret
+
+    def warm(self, peakStart, peakEnd):
+        '''
+        Fetch the planned requests now, spread evenly until peakStart.
+        :return: int, requests that were cached
+        '''
+        todo = self.plan(peakStart, peakEnd)
+        if not todo:
+            return 0
+
+        seconds = max(0, (peakStart - datetime.datetime.now()).total_seconds())
+        interval = max(seconds / len(todo), 60 / self.maxRequestsPerMinute)
+
+        warmed = 0
+        for i, (apiName, attribute_name, kwargs) in enumerate(todo):
+            if i and self._stopEvent.wait(interval):
+                break
+
+            ttl = max(1, (peakEnd - datetime.datetime.now()).total_seconds())
+            try:
+                getattr(getattr(self.libcal, apiName), attribute_name)(cacheTTL=ttl, **kwargs)
+                warmed += 1
+            except Exception as e:
+                self.libcal.print('CacheWarmer', apiName, attribute_name, kwargs, e)
+
+        self.libcal.accessLog.decay(self.decay)
+        return warmed
+
+    def _run(self):
+        while not self._stopEvent.is_set():
+            peakStart, peakEnd = self.next_peak()
+            if self._stopEvent.wait(max(0, (peakStart - self.lead - datetime.datetime.now()).total_seconds())):
+                return
+            warmed = self.warm(peakStart, peakEnd)
+            self.libcal.print('CacheWarmer warmed', warmed, 'responses for the peak at', peakStart)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopEvent.clear()
+            self._thread = threading.Thread(target=self._run, name='CacheWarmer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class _NDJSONWriter:
+    extension = 'ndjson'
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, row):
+        self.file.write(json.dumps(row, default=str))
+        self.file.write('\n')
+
+    def close(self):
+        self.file.close()
+
+    discard = close
+
+
+class _CSVWriter:
+    '''
+    Rows are spooled to a temporary file and the CSV is written on close, so the header has every key
+        that appears in any row, however late. Nested values are written as JSON.
+    '''
+    extension = 'csv'
+
+    def __init__(self, path):
+        self.path = path
+        self.spool = tempfile.TemporaryFile('w+', encoding='utf-8', dir=os.path.dirname(path) or None)
+        self.columns = {}
+
+    @staticmethod
+    def _flatten(row):
+        return {k: json.dumps(v, default=str) if isinstance(v, (dict, list)) else v for k, v in row.items()}
+
+    def write(self, row):
+        row = self._flatten(row)
+        self.columns.update(dict.fromkeys(row))
+        self.spool.write(json.dumps(row, default=str))
+        self.spool.write('\n')
+        return row
+
+    def _rows(self):
+        self.spool.seek(0)
+        for line in self.spool:
+            yield json.loads(line)
+
+    def close(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=list(self.columns))
+                writer.writeheader()
+                writer.writerows(self._rows())
+        finally:
+            self.spool.close()
+
+    def discard(self):
+        self.spool.close()
+
+
+class _ParquetWriter(_CSVWriter):
+    '''
+    Rows are spooled like _CSVWriter while the schema is inferred bufferSize rows at a time and widened
+        as needed (a column that was null so far, a new column, int to float), then written as
+        row groups of bufferSize rows on close. Requires pyarrow.
+    '''
+    extension = 'parquet'
+    bufferSize = 10000
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Parquet export requires pyarrow. Try "pip install pyarrow"')
+
+        super().__init__(path)
+        self.pyarrow = pyarrow
+        self.schema = None
+        self.buffer = []
+
+    def _infer(self):
+        if self.buffer:
+            schema = self.pyarrow.Table.from_pylist(self.buffer).schema
+            if self.schema is not None:
+                schema = self.pyarrow.unify_schemas([self.schema, schema], promote_options='permissive')
+            self.schema = schema
+            self.buffer = []
+
+    def write(self, row):
+        self.buffer.append(super().write(row))
+        if len(self.buffer) >= self.bufferSize:
+            self._infer()
+
+    def close(self):
+        try:
+            self._infer()
+            if self.schema is None:
+                # no rows at all; write an empty file so the shard is recorded as done
+                self.pyarrow.parquet.write_table(self.pyarrow.table({}), self.path)
+                return
+
+            with self.pyarrow.parquet.ParquetWriter(self.path, self.schema) as writer:
+                rows = []
+                for row in self._rows():
+                    rows.append(row)
+                    if len(rows) >= self.bufferSize:
+                        writer.write_table(self.pyarrow.Table.from_pylist(rows, schema=self.schema))
+                        rows = []
+                if rows:
+                    writer.write_table(self.pyarrow.Table.from_pylist(rows, schema=self.schema))
+        finally:
+            self.spool.close()
+
+
+_EXPORT_WRITERS = {
+    'ndjson': _NDJSONWriter,
+    'csv': _CSVWriter,
+    'parquet': _ParquetWriter,
+}
+
+_exportClient = None  # LibCal used by export worker processes
+
+
+def _init_export_worker(kwargs):
+    global _exportClient
+    _exportClient = LibCal(**kwargs)
+
+
+def _export_shard_rows(lc, shard):
+    dataset = shard['dataset']
+
+    if dataset == 'bookings':
+        params = {k: v for k, v in shard.items() if k in ('lid', 'cid', 'date', 'days')}
+        yield from lc.pages(lc.spaces.bookings, pageKey='page', sizeKey='limit', pageSize=500, firstPage=1, **params)
+
+    elif dataset == 'seats':
+        yield from lc.pages(
+            lc.spaces.seats,
+            pageKey='pageIndex',
+            sizeKey='pageSize',
+            pageSize=100,
+            firstPage=0,
+            location_id=shard['lid'],
+            availability=None,
+        )
+
+    elif dataset == 'events':
+        seen = set()
+        for event in _export_events(lc, shard['cal_id'], shard['date'], shard['days']):
+            if event.get('id', None) is not None:
+                if event['id'] in seen:  # events spanning a split window are returned twice
+                    continue
+                seen.add(event['id'])
+            yield event
+
+    else:
+        raise ValueError('Unknown dataset "{}"'.format(dataset))
+
+
+def _export_events(lc, calID, date, days, limit=500):
+    '''
+    The events endpoint has no paging, so a window that returns limit events may have been cut off.
+        Such windows are split in half until every part fits.
+    '''
+    resp = lc.events.events(cal_id=calID, date=date, days=days, limit=limit)
+    events = resp.get('events', []) if isinstance(resp, dict) else resp
+    if len(events) < limit:
+        yield from events
+    elif days > 1:
+        half = days // 2
+        yield from _export_events(lc, calID, date, half, limit)
+        yield from _export_events(lc, calID, date + datetime.timedelta(days=half), days - half, limit)
+    else:
+        raise LibCalError('Calendar {} has {} or more events on {}, more than one request can return'.format(
+            calID, limit, date))
+
+
+def _export_shard(shard, outDir, fmt, lc=None):
+    '''
+    Write one shard to its own file. The file is written under a temporary name and renamed
+        when complete, so an interrupted export can be resumed by skipping finished files.
+    :param lc: LibCal, defaults to the client of this worker process
+    :return: int, rows written
+    '''
+    writerClass = _EXPORT_WRITERS[fmt]
+    path = os.path.join(outDir, '{}.{}'.format(shard['name'], writerClass.extension))
+    tmpPath = path + '.part'
+
+    rows = 0
+    writer = writerClass(tmpPath)
+    try:
+        try:
+            with _untracked():
+                for row in _export_shard_rows(lc or _exportClient, shard):
+                    writer.write(row)
+                    rows += 1
+        except BaseException:
+            writer.discard()
+            raise
+        writer.close()
+    except BaseException:
+        # don't leave a half written file behind, the shard is redone on the next run
+        with contextlib.suppress(OSError):
+            os.remove(tmpPath)
+        raise
+
+    os.replace(tmpPath, path)
+    return rows
+
+
+class Exporter:
+    '''
+    Dumps bookings, seat inventories or events to one file per shard.
+
+    Work is split into shards by location (or category/calendar) and date window,
+        and the shards run in parallel on a thread or process pool.
+    Rows are streamed page by page to the output files, so memory use does not grow with the export.
+    Finished shards are skipped when the same export is run again, so an interrupted export can be resumed.
+    '''
+
+    def __init__(self, libcalKwargs, outDir, fmt='ndjson', workers=4, processes=False, log=None):
+        '''
+        :param libcalKwargs: dict of LibCal() arguments; each worker process builds its own client
+        :param outDir: str, directory to write into
+        :param fmt: str, 'ndjson', 'csv' or 'parquet'
+        :param workers: int
+        :param processes: bool, use a process pool instead of a thread pool
+        :param log: function(str) for progress, defaults to printing to stderr
+        '''
+        if fmt not in _EXPORT_WRITERS:
+            raise ValueError('Unknown format "{}", choose from {}'.format(fmt, list(_EXPORT_WRITERS)))
+
+        self.libcalKwargs = libcalKwargs
+        self.outDir = outDir
+        self.fmt = fmt
+        self.workers = workers
+        self.processes = processes
+        self.log = log or (lambda msg: print(msg, file=sys.stderr))
+        self._client = None
+        self._clientLock = threading.Lock()
+
+    @property
+    def client(self):
+        '''
+        LibCal built from this exporter's libcalKwargs, used for listing locations and by thread workers.
+        '''
+        with self._clientLock:
+            if self._client is None:
+                self._client = LibCal(**self.libcalKwargs)
+            return self._client
+
+    @staticmethod
+    def _windows(since, until, windowDays):
+        day = since
+        while day <= until:
+            days = min(windowDays, (until - day).days + 1)
+            yield day, days
+            day += datetime.timedelta(days=days)
+
+    def shards(self, dataset, since=None, until=None, windowDays=1, lids=None, cids=None, calIDs=None):
+        '''
+        :param dataset: str, 'bookings', 'seats' or 'events'
+        :param since: datetime.date, first day to export
+        :param until: datetime.date, last day to export (inclusive)
+        :param windowDays: int, days per shard
+        :param lids: list of location IDs. Defaults to every location.
+        :param cids: list of category IDs. If given, bookings are sharded by category instead of location.
+        :param calIDs: list of calendar IDs, required for events
+        :return: list of dicts
+        '''
+        since = since or datetime.date.today()
+        until = until or since
+
+        if dataset == 'events':
+            if not calIDs:
+                raise ValueError('Exporting events requires at least one calendar ID')
+            keys = [('cal_id', ID) for ID in calIDs]
+        elif dataset == 'bookings' and cids:
+            keys = [('cid', ID) for ID in cids]
+        else:
+            if not lids:
+                with _untracked():
+                    lids = [loc['lid'] for loc in self.client.spaces.locations()]
+            keys = [('lid', ID) for ID in lids]
+
+        ret = []
+        for key, ID in keys:
+            if dataset == 'seats':
+                ret.append({'dataset': dataset, key: ID, 'name': '{}-{}{}'.format(dataset, key, ID)})
+                continue
+
+            for day, days in self._windows(since, until, windowDays):
+                ret.append({
+                    'dataset': dataset,
+                    key: ID,
+                    'date': day,
+                    'days': days,
+                    'name': '{}-{}{}-{}-{}d'.format(dataset, key, ID, day.isoformat(), days),
+                })
+        return ret
+
+    def run(self, shards):
+        '''
+        :param shards: list of dicts from shards()
+        :return: int, rows written by this run
+        '''
+        os.makedirs(self.outDir, exist_ok=True)
+
+        existing = set(os.listdir(self.outDir))
+        todo = [s for s in shards if '{}.{}'.format(s['name'], _EXPORT_WRITERS[self.fmt].extension) not in existing]
+        if len(todo) < len(shards):
+            self.log('Resuming: {} of {} shards already exported'.format(len(shards) - len(todo), len(shards)))
+
+        if self.processes:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_export_worker,
+                initargs=(self.libcalKwargs,),
+            )
+            lc = None
+        else:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+            lc = self.client
+
+        total = 0
+        startTime = time.monotonic()
+        with executor:
+            futures = {executor.submit(_export_shard, s, self.outDir, self.fmt, lc): s for s in todo}
+            for i, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                shard = futures[future]
+                rows = future.result()
+                total += rows
+                elapsed = time.monotonic() - startTime
+                self.log('[{}/{}] {}: {} rows ({:.0f} rows/s)'.format(
+                    i, len(todo), shard['name'], rows, total / elapsed if elapsed else 0))
+
+        elapsed = time.monotonic() - startTime
+        self.log('Exported {} rows in {:.1f}s ({:.0f} rows/s)'.format(total, elapsed, total / elapsed if elapsed else 0))
+        return total
+
+
+def _export_main(argv=None):
+    '''
+    Command line entry point, like:
+        python libcal.py export bookings --since 2024-01-01 --until 2024-05-31 --format parquet --out dump/
+    Credentials are read from --base-url/--client-id/--client-secret, then the
+        LIBCAL_BASE_URL/LIBCAL_CLIENT_ID/LIBCAL_CLIENT_SECRET environment variables, then config.py.
+    '''
+    parser = argparse.ArgumentParser(prog='libcal.py export', description='Export LibCal data to files.')
+    parser.add_argument('dataset', choices=['bookings', 'seats', 'events'])
+    parser.add_argument('--since', type=datetime.date.fromisoformat, help='first day, YYYY-MM-DD (default today)')
+    parser.add_argument('--until', type=datetime.date.fromisoformat, help='last day, YYYY-MM-DD (default --since)')
+    parser.add_argument('--window-days', type=int, default=1, help='days per shard')
+    parser.add_argument('--lid', type=int, action='append', help='location ID, may be repeated (default all)')
+    parser.add_argument('--cid', type=int, action='append', help='category ID, may be repeated')
+    parser.add_argument('--cal-id', type=int, action='append', help='calendar ID for events, may be repeated')
+    parser.add_argument('--format', choices=list(_EXPORT_WRITERS), default='ndjson')
+    parser.add_argument('--out', default='libcal_export')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--processes', action='store_true', help='use worker processes instead of threads')
+    parser.add_argument('--base-url', default=os.environ.get('LIBCAL_BASE_URL', None))
+    parser.add_argument('--client-id', default=os.environ.get('LIBCAL_CLIENT_ID', None))
+    parser.add_argument('--client-secret', default=os.environ.get('LIBCAL_CLIENT_SECRET', None))
+    args = parser.parse_args(argv)
+
+    if not (args.base_url and args.client_id and args.client_secret):
+        import config
+        args.base_url = args.base_url or config.BASE_URL
+        args.client_id = args.client_id or config.CLIENT_ID
+        args.client_secret = args.client_secret or config.CLIENT_SECRET
+
+    exporter = Exporter(
+        libcalKwargs={'baseURL': args.base_url, 'clientID': args.client_id, 'clientSecret': args.client_secret},
+        outDir=os.path.join(args.out, args.dataset),
+        fmt=args.format,
+        workers=args.workers,
+        processes=args.processes,
+    )
+    shards = exporter.shards(
+        args.dataset,
+        since=args.since,
+        until=args.until,
+        windowDays=args.window_days,
+        lids=args.lid,
+        cids=args.cid,
+        calIDs=args.cal_id,
+    )
+    exporter.run(shards)
+    return 0
+
+
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['export']:
+        sys.exit(_export_main(sys.argv[2:]))
+
     import random
     import config
 
@@ -0,0 +1,145 @@
+import datetime
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeLibCal(BaseHTTPRequestHandler):
+    '''
+    Echoes the path and query of every GET back, so each caller can check it got its own request.
+    Tokens expire after one second, so refreshes race with requests in flight.
+    '''
+    protocol_version = 'HTTP/1.1'
+    tokenFetches = 0
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with FakeLibCal.lock:
+            FakeLibCal.connections += 1
+
+    def log_message(self, *a):
+        pass
+
+    def reply(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.endswith('oauth/token'):
+            with FakeLibCal.lock:
+                FakeLibCal.tokenFetches += 1
+                n = FakeLibCal.tokenFetches
+            time.sleep(0.05)
+            return self.reply({'access_token': 'tok{}'.format(n), 'expires_in': 1, 'scope': 's'})
+        self.reply({'echo': json.loads(body or b'{}')})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not self.headers.get('Authorization', '').startswith('Bearer tok'):
+            return self.reply({'error': 'unauthorized'}, 401)
+        time.sleep(random.random() * 0.005)
+        self.reply([{'path': url.path, 'query': {k: v[0] for k, v in parse_qs(url.query).items()}}])
+
+
+@pytest.fixture
+def server():
+    '''
+    :return: base URL of a FakeLibCal listening on every loopback address, so
+        http://127.0.0.2:port/, http://127.0.0.3:port/, ... are distinct hosts for the same server
+    '''
+    FakeLibCal.tokenFetches = 0
+    FakeLibCal.connections = 0
+    srv = ThreadingHTTPServer(('', 0), FakeLibCal)
+    srv.daemon_threads = True
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}/'.format(srv.server_port)
+    srv.shutdown()
+    srv.server_close()
+
+
+class FakeResponse:
+    def __init__(self, data, status=200):
+        self.content = json.dumps(data, default=str).encode()
+        self.text = self.content.decode()
+        self.status_code = status
+        self.ok = status < 400
+        self.reason = 'OK' if self.ok else 'Error'
+        self.headers = {}
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeTransport:
+    '''
+    In-process transport for LibCal(transport=...).
+    route(method, path, params) returns the response data, or a FakeResponse for other status codes.
+    Every request is kept in calls as (method, path, params).
+    '''
+
+    def __init__(self, route, latency=0):
+        self.route = route
+        self.latency = latency
+        self.calls = []
+        self.responses = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, params=None, json=None, data=None, **kwargs):
+        path = urlparse(url).path.lstrip('/')
+        if path.endswith('oauth/token'):
+            return FakeResponse({'access_token': 't', 'expires_in': 3600, 'scope': 's'})
+        params = dict(params if params is not None else json or {})
+        with self.lock:
+            self.calls.append((method, path, params))
+        if self.latency:
+            time.sleep(self.latency(path) if callable(self.latency) else self.latency)
+        data = self.route(method, path, params)
+        resp = data if isinstance(data, FakeResponse) else FakeResponse(data)
+        with self.lock:
+            self.responses.append(resp)
+        return resp
+
+    def paths(self, prefix=''):
+        with self.lock:
+            return [path for method, path, params in self.calls if path.startswith(prefix)]
+
+
+def page(rows, params, pageKey='page', sizeKey='limit', firstPage=1):
+    '''
+    The slice of rows a paged endpoint would return for these params.
+    '''
+    size = int(params[sizeKey])
+    start = (int(params[pageKey]) - firstPage) * size
+    return rows[start:start + size]
+
+
+def slots(start, count, minutes=30):
+    return [
+        {
+            'from': (start + datetime.timedelta(minutes=minutes * i)).isoformat(),
+            'to': (start + datetime.timedelta(minutes=minutes * (i + 1))).isoformat(),
+        }
+        for i in range(count)
+    ]
@@ -0,0 +1,53 @@
+import datetime
+import re
+
+from conftest import FakeTransport, page
+from libcal import CacheWarmer, LibCal
+
+
+def route(method, path, params):
+    if path == '1.1/space/locations':
+        return [{'lid': 3, 'name': 'Main'}]
+    if path == '1.1/space/bookings':
+        return page([{'bookId': '{}-{}'.format(params['date'], i), 'fromDate': '{}T09:00:00'.format(params['date'])} for i in range(3)],
+                    params)
+    if re.match(r'1.1/space/category/', path):
+        return [{'cid': 9, 'items': []}]
+    raise AssertionError(path)
+
+
+def test_access_log_is_opt_in():
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=FakeTransport(route))
+    lc.spaces.category(cid=9)
+    assert lc.accessLog is None
+
+    log = lc.track_access()
+    assert lc.spaces.accessLog is log
+    lc.spaces.category(cid=9)
+    assert len(log) == 1
+
+
+def test_bulk_traffic_is_not_counted():
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=FakeTransport(route), accessLog=True)
+    since = datetime.date(2024, 1, 8)
+    assert len(list(lc.iter_bookings(since, since + datetime.timedelta(days=120), raw=True))) == 121 * 3
+    list(lc.pages(lc.spaces.bookings, lid=3))
+    for _ in range(5):
+        lc.spaces.category(cid=9)
+
+    assert lc.accessLog.top() == [(5, 'spaces', 'category', {'cid': 9})]
+
+
+def test_only_dates_for_today_are_dropped():
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=FakeTransport(route), cacheTTL=60, accessLog=True)
+    lc.spaces.bookings(lid=3, date=datetime.date.today())
+    lc.spaces.bookings(lid=3, date=datetime.date(2024, 1, 8))
+
+    keys = [kwargs for count, apiName, attribute_name, kwargs in lc.accessLog.top()]
+    assert {'lid': 3} in keys
+    assert {'lid': 3, 'date': datetime.date(2024, 1, 8)} in keys
+
+    warmer = CacheWarmer(lc)
+    peakStart = datetime.datetime.now() + datetime.timedelta(days=1)
+    dates = sorted(kwargs['date'] for apiName, attribute_name, kwargs in warmer.plan(peakStart, peakStart))
+    assert dates == [datetime.date(2024, 1, 8), peakStart.date()]
@@ -0,0 +1,72 @@
+import datetime
+
+import pytest
+
+from conftest import FakeTransport, page
+from libcal import LibCal, LibCalPool
+
+
+def route(method, path, params):
+    if path == '1.1/equipment/locations':
+        return [{'lid': lid, 'name': 'L{}'.format(lid)} for lid in (1, 2)]
+    if path.startswith('1.1/equipment/categories/'):
+        lid = int(path.rsplit('/', 1)[1])
+        return [{'lid': lid, 'categories': [{'cid': lid * 10 + i, 'name': 'C{}'.format(i)} for i in range(3)]}]
+    if path.startswith('1.1/equipment/category/'):
+        cid = int(path.rsplit('/', 1)[1])
+        return [{'cid': cid, 'items': [{'id': cid * 10 + i, 'name': 'I{}'.format(i)} for i in range(4)]}]
+    if path.startswith('1.1/equipment/item/'):
+        return [{'id': int(i), 'name': 'I{}'.format(i)} for i in path.rsplit('/', 1)[1].split(',')]
+    if path == '1.1/appointments/bookings':
+        rows = [
+            {'bookId': '{}-{}'.format(params['date'], i), 'fromDate': '{}T{:02d}:00:00'.format(params['date'], 8 + i)}
+            for i in range(3)
+        ]
+        return page(rows, params)
+    raise AssertionError(path)
+
+
+@pytest.fixture
+def pool():
+    pool = LibCalPool(maxWorkers=2, transport=FakeTransport(route))
+    pool.add('law', 'https://x.libcal.com/', 'id', 'secret', maxConcurrent=1)
+    yield pool
+    pool.close(wait=False)
+
+
+def test_equipment_items_inside_a_tenant_task(pool):
+    futures = [pool.submit('law', lambda lc: lc.equipment_items()) for _ in range(3)]
+    assert [len(future.result(timeout=10)) for future in futures] == [2 * 3 * 4] * 3
+
+
+def test_equipment_availability_inside_a_tenant_task(pool):
+    futures = [pool.submit('law', lambda lc: lc.equipment_availability(range(120), batchSize=25)) for _ in range(3)]
+    for future in futures:
+        assert sorted(future.result(timeout=10)) == list(range(120))
+
+
+def test_iter_appointments_inside_a_tenant_task(pool):
+    since = datetime.date(2024, 1, 8)
+    futures = [
+        pool.submit('law', lambda lc: list(lc.iter_appointments(since, since + datetime.timedelta(days=9), workers=4)))
+        for _ in range(3)
+    ]
+    for future in futures:
+        appointments = future.result(timeout=10)
+        assert len(appointments) == 10 * 3
+        assert [row['fromDate'] for row in appointments] == sorted(row['fromDate'] for row in appointments)
+
+
+def test_iter_appointments_are_not_indexed():
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=FakeTransport(route))
+    since = datetime.date(2024, 1, 8)
+    assert len(list(lc.iter_appointments(since, since + datetime.timedelta(days=30)))) == 31 * 3
+    assert len(lc.index) == 0
+
+
+def test_equipment_item_by_str_id():
+    transport = FakeTransport(route)
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=transport)
+    assert lc.equipment_item('123')['name'] == 'I123'
+    assert lc.equipment_item(123)['name'] == 'I123'
+    assert len(transport.paths('1.1/equipment/item/')) == 1
@@ -0,0 +1,106 @@
+import csv
+import datetime
+import json
+import os
+
+import pytest
+
+from conftest import FakeResponse, FakeTransport, page
+from libcal import Exporter, LibCalError, _CSVWriter, _ParquetWriter
+
+
+def bookings_route(method, path, params):
+    if path == '1.1/space/bookings':
+        rows = [{'bookId': '{}-{}-{}'.format(params['lid'], params['date'], i)} for i in range(5)]
+        return page(rows, params)
+    raise AssertionError(path)
+
+
+def events_route(perDay):
+    def route(method, path, params):
+        assert path == '1.1/events'
+        day = datetime.date.fromisoformat(str(params['date']))
+        events = [
+            {'id': '{}-{}'.format(day + datetime.timedelta(days=d), i)}
+            for d in range(int(params['days']))
+            for i in range(perDay(day + datetime.timedelta(days=d)))
+        ]
+        return {'events': events[:int(params['limit'])]}
+    return route
+
+
+def test_csv_header_has_late_columns(tmp_path):
+    path = str(tmp_path / 'rows.csv')
+    writer = _CSVWriter(path)
+    for i in range(1200):
+        writer.write(dict({'id': i}, **({'extra': 'x{}'.format(i)} if i > 1100 else {})))
+    writer.close()
+
+    with open(path, newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 1200
+    assert rows[-1]['extra'] == 'x1199'
+    assert rows[0]['extra'] == ''
+
+
+def test_parquet_widens_schema(tmp_path, monkeypatch):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+
+    monkeypatch.setattr(_ParquetWriter, 'bufferSize', 10)
+    path = str(tmp_path / 'rows.parquet')
+    writer = _ParquetWriter(path)
+    for i in range(35):
+        writer.write({
+            'id': i,
+            'note': 'n{}'.format(i) if i >= 20 else None,
+            'cost': 1.5 if i >= 30 else 1,
+            'late': True if i == 34 else None,
+        })
+    writer.close()
+
+    table = pyarrow.parquet.read_table(path)
+    assert table.num_rows == 35
+    assert table.column('note').to_pylist()[20] == 'n20'
+    assert table.column('cost').to_pylist()[:2] == [1.0, 1.0]
+    assert table.column('late').to_pylist()[-1] is True
+
+
+def test_each_exporter_uses_its_own_client(tmp_path):
+    transports = [FakeTransport(bookings_route), FakeTransport(bookings_route)]
+    exporters = [
+        Exporter({'baseURL': 'https://{}.libcal.com/'.format(name), 'clientID': name, 'clientSecret': 's',
+                  'transport': transport}, str(tmp_path / name), log=lambda msg: None)
+        for name, transport in zip('ab', transports)
+    ]
+    day = datetime.date(2024, 1, 8)
+    for exporter in exporters:
+        assert exporter.run(exporter.shards('bookings', day, lids=[1, 2])) == 10
+
+    assert [len(transport.calls) for transport in transports] == [2, 2]
+
+
+def test_events_windows_are_split(tmp_path):
+    exporter = Exporter({'baseURL': 'https://x.libcal.com/', 'clientID': 'a', 'clientSecret': 's',
+                         'transport': FakeTransport(events_route(lambda day: 100))},
+                        str(tmp_path), log=lambda msg: None)
+    shards = exporter.shards('events', datetime.date(2024, 1, 1), datetime.date(2024, 1, 7), windowDays=7,
+                             calIDs=[5])
+    assert exporter.run(shards) == 700
+
+    with open(os.path.join(str(tmp_path), shards[0]['name'] + '.ndjson')) as file:
+        ids = [json.loads(line)['id'] for line in file]
+    assert len(set(ids)) == 700
+
+
+def test_failed_shard_leaves_no_file(tmp_path):
+    def route(method, path, params):
+        if path == '1.1/events':
+            return events_route(lambda day: 600)(method, path, params)
+        return FakeResponse({}, 500)
+
+    exporter = Exporter({'baseURL': 'https://x.libcal.com/', 'clientID': 'a', 'clientSecret': 's',
+                         'transport': FakeTransport(route)}, str(tmp_path), fmt='csv', log=lambda msg: None)
+    with pytest.raises(LibCalError):
+        exporter.run(exporter.shards('events', datetime.date(2024, 1, 1), windowDays=1, calIDs=[5]))
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,57 @@
+import datetime
+
+import pytest
+
+from conftest import FakeTransport, page
+from libcal import LibCal, LibCalPool
+
+
+def route(method, path, params):
+    if path == '1.1/space/locations':
+        return [{'lid': lid, 'name': 'L{}'.format(lid)} for lid in (1, 2, 3)]
+    if path == '1.1/space/bookings':
+        rows = [
+            {'bookId': '{}-{}-{}'.format(params['lid'], params['date'], i), 'fromDate': '{}T{:02d}:00:00'.format(
+                params['date'], 8 + i)}
+            for i in range(4)
+        ]
+        return page(rows, params)
+    raise AssertionError(path)
+
+
+@pytest.fixture
+def pool():
+    pool = LibCalPool(maxWorkers=2, transport=FakeTransport(route))
+    yield pool
+    pool.close(wait=False)
+
+
+def test_iter_bookings_inside_a_tenant_task(pool):
+    pool.add('law', 'https://x.libcal.com/', 'id', 'secret', maxConcurrent=1)
+    since = datetime.date(2024, 1, 8)
+    futures = [
+        pool.submit('law', lambda lc: list(lc.iter_bookings(since, since + datetime.timedelta(days=9), workers=4)))
+        for _ in range(3)
+    ]
+    for future in futures:
+        bookings = future.result(timeout=10)
+        assert len(bookings) == 10 * 3 * 4
+        starts = [booking.start for booking in bookings]
+        assert starts == sorted(starts)
+
+
+def test_iter_bookings_inside_lc_submit():
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=FakeTransport(route))
+    since = datetime.date(2024, 1, 8)
+    futures = [
+        lc.submit(lambda: len(list(lc.iter_bookings(since, since + datetime.timedelta(days=3)))))
+        for _ in range(12)
+    ]
+    assert [future.result(timeout=10) for future in futures] == [4 * 3 * 4] * 12
+
+
+def test_range_pulls_are_not_indexed():
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=FakeTransport(route))
+    since = datetime.date(2024, 1, 8)
+    assert len(list(lc.iter_bookings(since, since + datetime.timedelta(days=30)))) == 31 * 3 * 4
+    assert len(lc.index) == 0
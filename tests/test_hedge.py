@@ -0,0 +1,51 @@
+import concurrent.futures
+import time
+
+from conftest import FakeTransport
+from libcal import LibCal
+
+
+def route(method, path, params):
+    return [{'id': 1}]
+
+
+def test_primary_requests_are_not_queued():
+    latency = [0.001]
+    transport = FakeTransport(route, latency=lambda path: latency[0])
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=transport, hedge=True)
+    for _ in range(20):
+        lc.spaces.item(ids=[1])
+
+    # every request is now far slower than the threshold, and there are only 4 duplicate slots
+    latency[0] = 0.2
+    startTime = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(16) as executor:
+        list(executor.map(lambda i: lc.spaces.item(ids=[i]), range(16)))
+    elapsed = time.monotonic() - startTime
+
+    assert elapsed < 0.6
+    assert lc.hedger.stats['hedged'] <= 4
+
+
+def test_latency_windows_are_kept_per_api():
+    latency = {'1.1/space/item': 0.03, '1.1/equipment/item': 0.001}
+    transport = FakeTransport(route, latency=lambda path: latency[path.rsplit('/', 1)[0]])
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=transport, hedge=['item'])
+    for _ in range(20):
+        lc.spaces.item(ids=[1])
+        lc.equipment.item(ids=[1])
+
+    assert lc.hedger.threshold(('spaces', 'item')) >= 0.03
+    assert lc.hedger.threshold(('equipment', 'item')) < 0.03
+
+
+def test_defaults_hedge_only_spaces_and_hours():
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=FakeTransport(route), hedge=True)
+    for _ in range(5):
+        lc.spaces.item(ids=[1])
+        lc.equipment.item(ids=[1])
+        lc.equipment.category(cid=1)
+        lc.hours.hours(ids=[1])
+
+    assert sorted(lc.hedger._latencies) == [('hours', 'hours'), ('spaces', 'item')]
+    assert lc.hedger.stats['calls'] == 10
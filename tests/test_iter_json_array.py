@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import FakeTransport  # noqa: E402
+from libcal import LibCal, _iter_json_array  # noqa: E402
+
+
+DOCUMENTS = [
+    '[]',
+    '[2.5]',
+    '[12.5, -0.25, 1e5, 2.5E-3, 1e+2, 0, -7]',
+    '[true, false, null, 10]',
+    '[{"id": 1, "name": "Room \\u00e9 \\"A\\""}, {"nested": [1, [2, 3], {"a": 4.75}]}, "x,]y", 3.14159]',
+    ' [ 1 ,\n 2 ,\t3 ] ',
+    '[{"name": "été ☃"}, "\U0001f600", 1.5]',
+]
+
+
+def chunked(text, size):
+    data = text.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+@pytest.mark.parametrize('size', list(range(1, 17)) + [64, 65536])
+def test_chunk_boundaries(document, size):
+    assert list(_iter_json_array(chunked(document, size))) == json.loads(document)
+
+
+def test_number_split_at_decimal_point():
+    assert list(_iter_json_array([b'[12.', b'5]'])) == [12.5]
+    assert list(_iter_json_array([b'[1', b'e', b'3, 2]'])) == [1000.0, 2]
+
+
+def test_not_an_array():
+    assert list(_iter_json_array(chunked('{"error": "x"}', 3))) == [{'error': 'x'}]
+
+
+def test_unterminated():
+    with pytest.raises(ValueError):
+        list(_iter_json_array(chunked('[1, 2', 2)))
+
+
+def test_invalid_element():
+    with pytest.raises(ValueError):
+        list(_iter_json_array(chunked('[12x]', 2)))
+
+
+@pytest.mark.parametrize('document', ['[,1]', '[1,,2]', '[1 2]', '[1,]', '["a" "b"]', '[{"a": 1}{"b": 2}]'])
+@pytest.mark.parametrize('size', [1, 3, 64])
+def test_bad_separators(document, size):
+    with pytest.raises(ValueError):
+        list(_iter_json_array(chunked(document, size)))
+
+
+def test_abandoned_stream_closes_the_response():
+    transport = FakeTransport(lambda method, path, params: [{'bookId': i} for i in range(100)])
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=transport)
+    rows = lc.spaces.bookings(lid=1, stream=True)
+    assert next(rows) == {'bookId': 0}
+    assert not transport.responses[-1].closed
+    rows.close()
+    assert transport.responses[-1].closed
+
+    assert len(list(lc.spaces.bookings(lid=1, stream=True))) == 100
+    assert transport.responses[-1].closed
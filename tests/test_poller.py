@@ -0,0 +1,90 @@
+import datetime
+import re
+import time
+
+from conftest import FakeTransport, page, slots
+from libcal import AvailabilityPoller, LibCal, Space
+
+
+def make_libcal(opensIn=None, seats=4):
+    '''
+    :param opensIn: timedelta until the first slot of the day, None means the spaces are open now
+    '''
+    now = datetime.datetime.now().astimezone().replace(second=0, microsecond=0)
+    first = now + opensIn if opensIn is not None else now - datetime.timedelta(minutes=10)
+    availability = slots(first, 8)
+
+    def route(method, path, params):
+        if re.match(r'1.1/space/item/', path):
+            return [{'id': int(i), 'availability': availability} for i in path.rsplit('/', 1)[1].split(',')]
+        if re.match(r'api/1.1/space/seats/', path):
+            rows = [{'id': k, 'name': 'Seat {}'.format(k), 'availability': availability} for k in range(seats)]
+            return page(rows, params, 'pageIndex', 'pageSize', 0)
+        raise AssertionError(path)
+
+    transport = FakeTransport(route)
+    return LibCal('https://x.libcal.com/', 'id', 'secret', transport=transport), transport
+
+
+def spaces(lc, count, whole=True):
+    return [Space(parent=lc, id=i, lid=1, name='S{}'.format(i), isBookableAsWhole=whole) for i in range(count)]
+
+
+def test_idle_open_spaces_back_off():
+    lc, transport = make_libcal()
+    poller = AvailabilityPoller(lc, minInterval=10, maxInterval=300, maxRequestsPerMinute=600)
+    watched = spaces(lc, 5)
+    for _ in range(7):
+        for space in watched:
+            poller.poll(space)
+
+    for space in watched:
+        state = poller._state[space.id]
+        assert state['interval'] == 300
+        assert state['effectiveInterval'] == 300
+
+
+def test_spaces_about_to_open_are_busy():
+    lc, transport = make_libcal(opensIn=datetime.timedelta(minutes=10))
+    poller = AvailabilityPoller(lc, minInterval=10, maxInterval=300, maxRequestsPerMinute=600)
+    watched = spaces(lc, 5)
+    for _ in range(7):
+        for space in watched:
+            poller.poll(space)
+
+    assert all(poller._state[space.id]['effectiveInterval'] == 10 for space in watched)
+
+
+def test_budget_applies_to_effective_intervals():
+    lc, transport = make_libcal(opensIn=datetime.timedelta(minutes=10))
+    poller = AvailabilityPoller(lc, minInterval=10, maxRequestsPerMinute=30)
+    watched = spaces(lc, 50)
+    for _ in range(2):
+        for space in watched:
+            poller.poll(space)
+
+    rate = sum(60 / poller._state[space.id]['effectiveInterval'] for space in watched)
+    assert abs(rate - 30) < 0.01
+
+
+def test_first_polls_are_spread_over_the_budget():
+    lc, transport = make_libcal()
+    poller = AvailabilityPoller(lc, maxRequestsPerMinute=30)
+    for space in spaces(lc, 100):
+        poller.subscribe(space, callback=lambda delta: None)
+
+    startTime = time.monotonic()
+    poller.run_pending()
+    assert len(transport.calls) <= 1 + (time.monotonic() - startTime) / 2
+
+    dueAts = sorted(state['dueAt'] for state in poller._state.values())
+    assert all(b - a >= 2 - 1e-6 for a, b in zip(dueAts[1:], dueAts[2:]))
+
+
+def test_every_seat_is_polled():
+    lc, transport = make_libcal(seats=250)
+    poller = AvailabilityPoller(lc)
+    space = spaces(lc, 1, whole=False)[0]
+    deltas = poller.poll(space)
+    assert len(deltas) == 250
+    assert len(transport.paths('api/1.1/space/seats')) == 3
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from conftest import FakeResponse, FakeTransport
+from libcal import CircuitOpenError, DeadlineExceeded, LibCal, LibCalError, deadline
+
+
+def test_half_open_trial_ends_on_deadline():
+    up = []
+
+    def route(method, path, params):
+        return [{'id': 1}] if up else FakeResponse({}, 500)
+
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=FakeTransport(route), resilience=True,
+                breakerThreshold=2, breakerResetTimeout=0.1)
+    for _ in range(2):
+        with pytest.raises(LibCalError):
+            lc.spaces.item(ids=[1])
+    with pytest.raises(CircuitOpenError):
+        lc.spaces.item(ids=[1])
+
+    # the half-open trial runs out of time before it is sent
+    time.sleep(0.15)
+    with pytest.raises(DeadlineExceeded):
+        with deadline(0):
+            lc.spaces.item(ids=[1])
+    assert lc.resilience.breakers['space'].state == 'open'
+
+    # the API is back: the next trial goes through and closes the breaker
+    up.append(True)
+    time.sleep(0.15)
+    assert lc.spaces.item(ids=[1]) == [{'id': 1}]
+    assert lc.resilience.breakers['space'].state == 'closed'
+    assert lc.spaces.item(ids=[1]) == [{'id': 1}]
@@ -0,0 +1,88 @@
+import datetime
+import re
+
+import pytest
+
+from conftest import FakeTransport, page, slots
+from libcal import LibCal, LibCalError, Seat, Space
+
+OLD = slots(datetime.datetime(2024, 1, 8, 9), 2)
+NEW = slots(datetime.datetime(2024, 1, 8, 13), 4)
+
+
+def seats_route(seats=4, availability=NEW):
+    def route(method, path, params):
+        if re.match(r'api/1.1/space/seats/', path):
+            rows = [{'id': k, 'name': 'Seat {}'.format(k), 'availability': availability} for k in range(seats)]
+            return page(rows, params, 'pageIndex', 'pageSize', 0)
+        raise AssertionError(path)
+    return route
+
+
+def test_find_refreshes_indexed_seats():
+    transport = FakeTransport(seats_route())
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=transport)
+    space = lc.index.add(Space(parent=lc, id=7, lid=1, name='Reading Room', location_name='Main'))
+    for k in range(4):
+        lc.index.add(Seat(parent=lc, id=k, name='Seat {}'.format(k), space_id=7, availability=OLD), parent=space)
+
+    seats = lc.find(seat_ids=[1, '3'])
+    assert [seat.id for seat in seats] == [1, 3]
+    assert all(seat['availability'] == NEW for seat in seats)
+    assert len(transport.paths('api/1.1/space/seats/')) == 1
+
+
+def reserve_route(freeFrom=0, reserved=None, cancelled=None):
+    '''
+    150 seats, those numbered freeFrom and up have four slots from 9:00 on the requested day.
+    '''
+    def route(method, path, params):
+        if re.match(r'api/1.1/space/seats/', path):
+            day = datetime.date.fromisoformat(str(params['availability']))
+            first = datetime.datetime.combine(day, datetime.time(9)).astimezone()
+            rows = [{'id': k, 'name': 'Seat {}'.format(k), 'availability': slots(first, 4) if k >= freeFrom else []}
+                    for k in range(150)]
+            return page(rows, params, 'pageIndex', 'pageSize', 0)
+        if path == '1.1/space/reserve':
+            return reserved or {'booking_id': ','.join('b{}'.format(b['seat_id']) for b in params['bookings'])}
+        if path.startswith('1.1/space/cancel/'):
+            return cancelled
+        raise AssertionError(path)
+    return route
+
+
+def space(lc):
+    return Space(parent=lc, id=7, lid=1, name='Reading Room', location_name='Main', isBookableAsWhole=False)
+
+
+def test_reserve_seats_past_the_first_page():
+    transport = FakeTransport(reserve_route(freeFrom=120))
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=transport)
+    startDT = datetime.datetime.combine(datetime.date.today() + datetime.timedelta(days=1), datetime.time(9))
+    bookings = space(lc).reserve_seats(3, 'A', 'B', 'a@b.c', startDT=startDT)
+    assert [booking.id for booking in bookings] == ['b120', 'b121', 'b122']
+    assert len(transport.paths('api/1.1/space/seats/')) == 2
+
+
+def test_reserve_seats_on_a_later_date():
+    transport = FakeTransport(reserve_route())
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=transport)
+    day = datetime.date.today() + datetime.timedelta(days=5)
+    space(lc).reserve_seats(2, 'A', 'B', 'a@b.c', startDT=datetime.datetime.combine(day, datetime.time(10)))
+    assert {params['availability'] for method, path, params in transport.calls
+            if path.startswith('api/1.1/space/seats/')} == {day.isoformat()}
+    reserve = [params for method, path, params in transport.calls if path == '1.1/space/reserve'][0]
+    assert datetime.datetime.fromisoformat(str(reserve['start'])).date() == day
+
+
+def test_reserve_seats_reports_bookings_left_behind():
+    transport = FakeTransport(reserve_route(
+        reserved={'bookings': [{'booking_id': 'b1'}, {'booking_id': 'b2'}, {'error': 'seat taken'}]},
+        cancelled=[{'booking_id': 'b1', 'cancelled': True}, {'booking_id': 'b2', 'cancelled': False}],
+    ))
+    lc = LibCal('https://x.libcal.com/', 'id', 'secret', transport=transport)
+    startDT = datetime.datetime.combine(datetime.date.today() + datetime.timedelta(days=1), datetime.time(9))
+    with pytest.raises(LibCalError) as info:
+        space(lc).reserve_seats(3, 'A', 'B', 'a@b.c', startDT=startDT)
+    assert 'could not be cancelled: b2:' in str(info.value)
+    assert transport.paths('1.1/space/cancel/') == ['1.1/space/cancel/b1,b2']
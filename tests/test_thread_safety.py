@@ -0,0 +1,65 @@
+import concurrent.futures
+import datetime
+import time
+
+from conftest import FakeLibCal
+from libcal import LibCal, LibCalPool
+
+
+def check(lc, i):
+    day = datetime.date(2024, 1, i % 28 + 1)
+    resp = lc.spaces.item(ids=[i, i + 1], availability=day if i % 2 == 0 else None)
+    assert resp[0]['path'] == '/1.1/space/item/{},{}'.format(i, i + 1)
+    if i % 2 == 0:
+        assert resp[0]['query']['availability'] == day.isoformat()
+    else:
+        assert 'availability' not in resp[0]['query']
+
+    resp = lc.spaces.bookings(lid=i)
+    assert resp[0]['query']['lid'] == str(i)
+    assert resp[0]['query']['date'] == datetime.date.today().isoformat()
+
+
+def test_shared_client(server):
+    lc = LibCal(server, 'id', 'secret', apiURL=server, maxConnections=64)
+    startTime = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(64) as executor:
+        list(executor.map(lambda i: check(lc, i), range(2000)))
+    elapsed = time.monotonic() - startTime
+
+    # one refresh per expiry, not one per waiting thread
+    assert FakeLibCal.tokenFetches <= elapsed + 3
+
+
+def test_shared_cache(server):
+    lc = LibCal(server, 'id', 'secret', apiURL=server, cacheTTL=60)
+    with concurrent.futures.ThreadPoolExecutor(32) as executor:
+        list(executor.map(lambda i: check(lc, i % 50), range(2000)))
+    assert len(lc.cache) <= 100
+
+
+def test_shared_index(server):
+    lc = LibCal(server, 'id', 'secret', apiURL=server)
+    lc.spaces.locations = lambda **kw: [{'lid': lid, 'name': 'L{}'.format(lid)} for lid in range(200)]
+    with concurrent.futures.ThreadPoolExecutor(32) as executor:
+        locations = [loc for result in executor.map(lambda i: lc.locations, range(64)) for loc in result]
+    assert len(locations) == 64 * 200
+    assert len(lc.index) == 200
+    assert lc.location(123)['name'] == 'L123'
+
+
+def test_pool_keeps_connections_per_tenant_host(server):
+    port = server.rsplit(':', 1)[1].strip('/')
+    pool = LibCalPool(maxWorkers=4, maxConnections=4)
+    names = ['t{}'.format(i) for i in range(6)]
+    for i, name in enumerate(names, start=2):
+        base = 'http://127.0.0.{}:{}/'.format(i, port)
+        pool.add(name, base, 'id', 'secret', apiURL=server, maxConcurrent=1)
+
+    for _ in range(5):
+        for name in names:
+            pool.submit(name, lambda lc: lc.spaces.item(ids=[1])).result()
+    pool.close()
+
+    # 6 tenant hosts and 1 token host, each connected once (token refreshes may add a few)
+    assert FakeLibCal.connections <= 7 + FakeLibCal.tokenFetches